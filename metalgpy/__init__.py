@@ -1,8 +1,35 @@
+import importlib
+
 from .__version__ import __version__
 
 name = "metalgpy"
 version = __version__
 
+from ._cache import ResultCache
+from ._profile import Profiler
 from ._decorator import *
 from ._expression import *
-from ._sample import sample
+
+# attributes imported on first access to keep "import metalgpy" fast, the
+# optimizer pulls scikit-optimize, scikit-learn and pandas
+# name -> (module, attribute of the module or None for the module itself)
+_LAZY_ATTRS = {
+    "sample": ("._sample", "sample"),
+    "optimizer": (".optimizer", None),
+    "sampler": (".sampler", None),
+    "constraints": (".constraints", None),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        module_name, attr = _LAZY_ATTRS[name]
+        module = importlib.import_module(module_name, __name__)
+        value = module if attr is None else getattr(module, attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
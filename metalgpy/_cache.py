@@ -0,0 +1,75 @@
+import collections
+import sys
+import threading
+
+
+def _sizeof(obj):
+    """Estimate the size in bytes of ``obj`` (``nbytes`` for arrays, shallow ``sys.getsizeof`` otherwise)."""
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(obj)
+
+
+class ResultCache:
+    """A thread-safe LRU cache of evaluation results bounded in number of entries and in bytes.
+
+    Args:
+        max_size (int, optional): the maximum number of entries. Defaults to ``128``, ``None`` for unbounded.
+        max_bytes (int, optional): the maximum total size in bytes of the entries. Defaults to ``None`` for unbounded.
+        sizeof (callable, optional): a function returning the size in bytes of a result. Defaults to ``None`` for ``nbytes`` of arrays and ``sys.getsizeof`` for other objects.
+    """
+
+    def __init__(self, max_size: int = 128, max_bytes: int = None, sizeof=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = _sizeof if sizeof is None else sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __repr__(self) -> str:
+        return f"ResultCache(size={len(self)}, nbytes={self.nbytes}, hits={self.hits}, misses={self.misses})"
+
+    def __deepcopy__(self, memo):
+        # a cache is a shared resource, deep clones of an expression reuse it
+        return self
+
+    def get(self, key, default=None):
+        """Return the result stored for ``key`` and mark it as the most recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store ``value`` for ``key`` and evict the least recently used entries if bounds are exceeded."""
+        nbytes = self.sizeof(value)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while (self.max_size is not None and len(self._entries) > self.max_size) or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -1,13 +1,73 @@
+import functools
+import inspect
+
 from ._expression import ObjectExpression
 
+# (object, ObjectExpression) of the objects transformed by meta, by id of the
+# object, both are kept alive so that the ObjectExpression (e.g., memoized) is
+# returned again and the id is not reused
+_META_OBJECTS = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _meta_class(name: str) -> type:
+    """Return the ``ObjectExpression`` subclass of the objects named ``name``, it is created once."""
+    return type(f"ObjectExpression_{name}", (ObjectExpression,), {"__slots__": ()})
+
 
 def meta(obj):
-    """Transform an object into an ``ObjectExpression`` Object."""
+    """Transform an object into an ``ObjectExpression`` Object.
+
+    Transforming the same object again returns the same ``ObjectExpression`` (e.g., ``memoize`` applies to all of them), the transformed objects are kept alive.
+    """
+    entry = _META_OBJECTS.get(id(obj))
+    if entry is None or entry[0] is not obj:
+        entry = obj, _meta_class(obj.__name__)(obj)
+        _META_OBJECTS[id(obj)] = entry
+
+    return entry[1]
+
+
+class MetaModule:
+    """A namespace transforming the attributes of a module with ``meta`` when they are first accessed, see ``meta_module``.
+
+    Args:
+        module (module): the wrapped module.
+    """
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name: str):
+        obj = getattr(self._module, name)
+        if inspect.ismodule(obj):
+            obj = MetaModule(obj)
+        elif callable(obj) and hasattr(obj, "__name__"):
+            obj = meta(obj)
+
+        # next accesses do not go through __getattr__
+        setattr(self, name, obj)
+        return obj
+
+    def __dir__(self):
+        return dir(self._module)
+
+    def __repr__(self) -> str:
+        return f"MetaModule({self._module.__name__})"
+
+
+def meta_module(module):
+    """Wrap a module (e.g., ``tf.keras.layers``) so that its classes and functions are transformed with ``meta`` lazily on attribute access. Sub-modules are wrapped the same way and other attributes are returned as is.
+
+    .. code-block:: python
+
+        layers = mpy.meta_module(tf.keras.layers)
+        x = layers.Dense(mpy.Int(16, 128))(x)
 
-    cls_attrs = {}
-    meta_class = type(
-        f"ObjectExpression_{obj.__name__}", (ObjectExpression,), cls_attrs
-    )
-    meta_obj = meta_class(obj)
+    Args:
+        module (module): the module to wrap.
 
-    return meta_obj
\ No newline at end of file
+    Returns:
+        (MetaModule): the wrapped module.
+    """
+    return MetaModule(module)
@@ -1,12 +1,22 @@
 import abc
 import collections
+import concurrent.futures
+import contextvars
 import copy
+import hashlib
 import inspect
+import itertools
+import operator
+import threading
+import time
+import weakref
 
 import numpy as np
-import scipy.stats
 import tree
 
+from ._cache import ResultCache
+from ._profile import _EVALUATION_HOOKS
+
 # https://docs.python.org/3/reference/datamodel.html#special-method-names
 # https://docs.python.org/3/library/operator.html
 BIN_OPS_SYNTAX_2_ATTR = {
@@ -34,6 +44,9 @@ BIN_OPS_SYNTAX_2_ATTR = {
     "or": "__or__",
 }
 BIN_OPS_ATTR_2_SYNTAX = {v: k for k, v in BIN_OPS_SYNTAX_2_ATTR.items()}
+# the functions of the operator module also try the reflected operation
+# (e.g., 1 + x calls x.__radd__(1) when int.__add__ is not implemented)
+BIN_OPS_SYNTAX_2_FUNC = {k: getattr(operator, v) for k, v in BIN_OPS_SYNTAX_2_ATTR.items()}
 
 # unary operators
 UNA_OPS_SYNTAX_2_ATTR = {
@@ -42,10 +55,72 @@ UNA_OPS_SYNTAX_2_ATTR = {
     "~": "__invert__",
 }
 UNA_OPS_ATTR_2_SYNTAX = {v: k for k, v in UNA_OPS_SYNTAX_2_ATTR.items()}
+UNA_OPS_SYNTAX_2_FUNC = {k: getattr(operator, v) for k, v in UNA_OPS_SYNTAX_2_ATTR.items()}
+
+# unique tokens identifying memoized expressions in a (shared) ResultCache
+_CACHE_TOKENS = itertools.count()
+_MISSING = object()
+
+# attributes of expressions which are not part of their structure
+_NON_STRUCTURAL_ATTRS = {
+    "value",
+    "var_id",
+    "_name",
+    "_scope_name",
+    "_dist",
+    "_cache",
+    "_cache_key",
+    "_cache_token",
+    "_cache_variables",
+    "_call_cache",
+    "_index",
+    "_parents",
+    "_plan",
+}
 
 
 class Expression:
 
+    __slots__ = (
+        # memoization of results, see memoize
+        "_cache",
+        "_cache_key",
+        "_cache_token",
+        "_cache_variables",
+        # cached VariableIndex and CompiledExpression of the tree and weak
+        # references to the parents of the node in indexed trees, see
+        # Expression._variable_index and Expression.compile
+        "_index",
+        "_parents",
+        "_plan",
+        "__weakref__",
+    )
+
+    # names of the attributes holding the sub-expressions of the node in
+    # traversal order, attributes of the instance __dict__ (if any) are also
+    # part of the structure unless they are in _NON_STRUCTURAL_ATTRS
+    _fields = ()
+
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls)
+        object.__setattr__(obj, "_cache", None)
+        object.__setattr__(obj, "_cache_key", None)
+        object.__setattr__(obj, "_index", None)
+        object.__setattr__(obj, "_parents", None)
+        object.__setattr__(obj, "_plan", None)
+        return obj
+
+    def __setattr__(self, name, value):
+        if name not in _NON_STRUCTURAL_ATTRS:
+            self._invalidate()
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        return _getstate(self)
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+
     # numerical operators
     def __add__(self, other):
         return BinaryExpression(self, other, BIN_OPS_ATTR_2_SYNTAX["__add__"])
@@ -116,44 +191,63 @@ class Expression:
     def __getitem__(self, item):
         return ExpressionItemAccess(self, item)
 
-    def __getattribute__(self, __name: str):
-        try:
-            return super().__getattribute__(__name)
-        except AttributeError:
-            return ExpressionAttributeAccess(self, __name)
+    def __getattr__(self, __name: str):
+        # only called when the attribute is not found
+        return ExpressionAttributeAccess(self, __name)
 
     def __call__(self, *args, **kwargs):
         return ExpressionCallExpression(self, *args, **kwargs)
 
     def choices(self):
-        memo = {}
+        """Retrieve the ``VarExpression`` of the ``Expression``-tree which are not nested in other variables.
 
-        def choice_aux(o):
-
-            if isinstance(o, Expression):
+        Returns:
+            (dict): a dictionnary where keys are variable ``id`` and values are ``VarExpression`` instances.
+        """
+        return dict(self._variable_index().choices)
 
-                if isinstance(o, VarExpression):
-                    memo[o.id] = o
-                else:
-                    memo.update(o.choices())
+    def _choices(self):
+        memo = {}
 
-            return memo
+        # variables are not expanded
+        children = lambda node: [] if isinstance(node, VarExpression) else node._children()
 
-        tree.map_structure(choice_aux, self.__dict__)
+        for node in _walk(self, children):
+            if isinstance(node, VarExpression):
+                memo[node.id] = node
 
         return memo
 
+    def _items(self):
+        """Return the ``(name, value)`` pairs of attributes holding the sub-expressions of the node in traversal order."""
+        items = [(k, getattr(self, k)) for k in self._fields]
+        attrs = _instance_dict(self)
+        if attrs:
+            items.extend(
+                sorted((k, v) for k, v in attrs.items() if k not in _NON_STRUCTURAL_ATTRS)
+            )
+        return items
+
+    def _children(self):
+        """Return the sub-expressions of the node in traversal order."""
+        return [
+            o for _, v in self._items() for o in tree.flatten(v) if isinstance(o, Expression)
+        ]
+
     def freeze(self, choice: dict):
 
         # propagate the materialization
-        def freeze_aux(o):
+        for _ in _walk(self, lambda node: node._freeze(choice)):
+            pass
 
-            if isinstance(o, Expression):
-                o.freeze(choice)
+        return self
 
-        tree.map_structure(freeze_aux, self.__dict__)
+    def _freeze(self, choice: dict):
+        """Freeze the node for ``choice`` and return the sub-expressions to freeze next."""
+        if self._cache is not None:
+            self._cache_key = self._cache_key_of(choice)
 
-        return self
+        return self._children()
 
     def evaluate_children(self):
 
@@ -166,74 +260,402 @@ class Expression:
                 eval_ = o
             return eval_
 
-        self.__dict__ = tree.map_structure(evaluate_aux, self.__dict__)
+        _setstate(self, tree.map_structure(evaluate_aux, _getstate(self)))
+
+    def evaluate(self, choice: dict = None, executor=None):
+        """Evaluate the value of the current expression.
+
+        Args:
+            choice (dict, optional): the values of the variables where keys are variable ``id``. If given, variables are resolved from ``choice`` and the ``Expression``-tree is left untouched so that it can be shared (e.g., across threads). Defaults to ``None`` to evaluate the tree in place from the frozen values of its variables.
+            executor (concurrent.futures.Executor, optional): an executor running independent function calls concurrently while respecting their data dependencies, variables are then resolved from ``choice`` or from their frozen values if ``choice`` is ``None``. Defaults to ``None`` to evaluate sequentially.
+
+        Raises:
+            ValueError: if ``executor`` is given without ``choice`` and a variable of the tree is not frozen.
+
+        Returns:
+            (any): the result of the evaluation.
+        """
+        if executor is not None and choice is None:
+            choice = self._frozen_choice()
+
+        if choice is not None:
+            return self.compile().evaluate(choice, executor)
+
+        results = {}
+        hooks = list(_EVALUATION_HOOKS)
+        stacks = _call_stacks(self) if hooks else {}
+
+        def children(node):
+            # memoized results are reused without evaluating sub-expressions
+            if node._cache_key is not None:
+                value = node._cache.get(node._cache_key, _MISSING)
+                if value is not _MISSING:
+                    results[id(node)] = value
+                    return []
+            if isinstance(node, VarExpression):
+                return [o for o in tree.flatten(node.value) if isinstance(o, Expression)]
+            return [o for o in tree.flatten(_getstate(node)) if isinstance(o, Expression)]
+
+        # sub-expressions are evaluated first so that evaluate_children does not recurse
+        for node in _walk(self, children, post_order=True):
+            if id(node) in results:
+                continue
+
+            replace_aux = lambda o: results[id(o)] if isinstance(o, Expression) else o
+            if isinstance(node, VarExpression):
+                value = tree.map_structure(replace_aux, node.value)
+            else:
+                # the node is evaluated from a copy holding the results of its
+                # sub-expressions so that the tree, which can share nodes with
+                # its clones, is left untouched
+                evaluated = node.__class__.__new__(node.__class__)
+                _setstate(evaluated, tree.map_structure(replace_aux, _getstate(node)))
+                start = time.perf_counter()
+                if type(node).evaluate is not Expression.evaluate:
+                    value = evaluated.evaluate()
+                else:
+                    value = evaluated._evaluate()
+                if id(node) in stacks:
+                    elapsed = time.perf_counter() - start
+                    stack, fingerprint = stacks[id(node)]
+                    for hook in hooks:
+                        hook(stack, fingerprint, elapsed, value)
+
+            if node._cache_key is not None:
+                node._cache.put(node._cache_key, value)
+            results[id(node)] = value
+
+        return results[id(self)]
+
+    def _frozen_choice(self) -> dict:
+        """Return the choice corresponding to the frozen values of the variables of the tree.
+
+        Raises:
+            ValueError: if a variable is not frozen.
+        """
+        choice = {}
+
+        def children(node):
+            if isinstance(node, VarExpression):
+                choice[node.id] = node._choice_of(node.value)
+                return [o for o in tree.flatten(node.value) if isinstance(o, Expression)]
+            return node._children()
+
+        for _ in _walk(self, children):
+            pass
+
+        return choice
+
+    async def aevaluate(self, choice: dict = None):
+        """Evaluate the value of the current expression in an event loop.
+
+        Calls returning awaitables (e.g., ``@meta`` coroutine functions) are awaited and independent ones run concurrently. The ``Expression``-tree is left untouched.
+
+        Args:
+            choice (dict, optional): the values of the variables where keys are variable ``id``. Defaults to ``None`` for an expression without variables.
+
+        Returns:
+            (any): the result of the evaluation.
+        """
+        return await self.compile().aevaluate(choice)
 
     @abc.abstractmethod
-    def evaluate(self):
-        """Evaluate the value of the current expression."""
+    def _evaluate(self):
+        """Evaluate the value of the current expression in place."""
         raise NotImplementedError
 
+    def evaluate_batch(self, choices):
+        """Evaluate the expression on a batch of choices at once with NumPy.
+
+        Only expressions made of variables, binary and unary operations can be evaluated in batch (e.g., arithmetic programs such as ``a + b * c``).
+
+        Args:
+            choices (dict or np.ndarray): the batch of choices. Either a dict where keys are variable ``id`` and values are 1-dim arrays, a structured array where fields are variable ``id`` or a 2-dim array where columns are ordered as ``variables()`` (e.g., the flat samples of a sampler).
+
+        Raises:
+            ValueError: if the expression cannot be evaluated in batch.
+
+        Returns:
+            (np.ndarray): the results of the evaluation.
+        """
+        if not isinstance(choices, dict):
+            choices = np.asarray(choices)
+            if choices.dtype.names is None:
+                choices = dict(zip(self.variables().keys(), choices.T))
+        return self.compile().evaluate_batch(choices)
+
+    def partial_evaluate(self, choice: dict = None):
+        """Fold the sub-expressions which do not depend on any variable into their values.
+
+        Variable-free sub-expressions are evaluated once and replaced by their results so that only the variable-dependent part of the tree is evaluated afterwards (e.g., for each trial of a search). Folded results are shared by all the evaluations of the returned expression. The ``Expression``-tree is left untouched.
+
+        Args:
+            choice (dict, optional): the values of some variables where keys are variable ``id``. If given, these variables are replaced by their values and the tree is specialized for them. Defaults to ``None``.
+
+        Returns:
+            (any): the folded ``Expression``-tree, or its value if it does not depend on any remaining variable.
+        """
+        choice = {} if choice is None else choice
+        folded = {}
+
+        def fold_aux(o):
+            if isinstance(o, Expression):
+                return folded[id(o)]
+            else:
+                return o
+
+        def children(node):
+            if isinstance(node, VarExpression) and node.id in choice:
+                return [o for o in tree.flatten(node._resolve(choice)) if isinstance(o, Expression)]
+            return node._children()
+
+        for node in _walk(self, children, post_order=True):
+            if isinstance(node, VarExpression) and node.id in choice:
+                folded[id(node)] = tree.map_structure(fold_aux, node._resolve(choice))
+                continue
+
+            state = _getstate(node)
+            for name, value in state.items():
+                if isinstance(value, Expression) or tree.is_nested(value):
+                    state[name] = tree.map_structure(fold_aux, value)
+
+            if state.get("_cache") is not None:
+                # the memoized results of the copy are keyed by the values it is specialized for
+                partial = tuple(choice.get(var_id) for var_id in state["_cache_variables"] if var_id in choice)
+                state["_cache_token"] = (state["_cache_token"], partial)
+                state["_cache_key"] = None
+                try:
+                    hash(state["_cache_token"])
+                except TypeError:
+                    state["_cache"] = None
+
+            cls = node.__class__
+            obj = cls.__new__(cls)
+            _setstate(obj, state)
+
+            if isinstance(node, VarExpression) or _contains_expression(list(state.values())):
+                folded[id(node)] = obj
+            else:
+                if obj._cache is not None:
+                    obj._cache_key = obj._cache_key_of(choice)
+                folded[id(node)] = obj.evaluate()
+
+        return folded[id(self)]
+
     def variables(self):
         """Retrieve all the ``VarExpression`` of the ``Expression``-tree.
 
         Returns:
             (dict): a dictionnary where keys are variable ``id`` and values are ``VarExpression`` instances.
         """
-        memo = {}
-
-        def choice_aux(o):
+        return dict(self._variable_index().variables)
 
-            if isinstance(o, Expression):
+    def _variable_index(self):
+        """Return the index of the variables of the ``Expression``-tree.
 
-                if isinstance(o, VarExpression) and not (o.id in memo):
-                    memo[o.id] = o
-                    memo.update(o.variables())
-                else:
-                    memo.update(o.variables())
+        The index is computed once and cached until the tree is structurally modified, i.e., when an attribute of one of its nodes is set. In-place modifications of containers held by nodes (e.g., ``args.append(...)``) must be followed by a call to ``invalidate``.
 
-            return memo
+        Returns:
+            (VariableIndex): the index of the variables.
+        """
+        index = self._index
+        if index is None:
+            index = VariableIndex(self)
+            self._index = index
+        return index
+
+    def _invalidate(self):
+        """Drop the cached index and plan of the node and of all its ancestors in indexed trees."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            parents = node._parents
+            object.__setattr__(node, "_index", None)
+            object.__setattr__(node, "_plan", None)
+            object.__setattr__(node, "_parents", None)
+            if parents:
+                stack.extend(p for p in (ref() for ref in parents.values()) if p is not None)
+
+    def _variables(self):
+        memo = {}
 
-        tree.map_structure(choice_aux, self.__dict__)
+        for node in _walk(self, lambda node: node._children()):
+            if isinstance(node, VarExpression) and node is not self:
+                memo.setdefault(node.id, node)
 
+        # a root variable comes after the variables nested in it
         if isinstance(self, VarExpression):
             memo[self.id] = self
 
         return memo
 
     def __copy__(self):
-        cls = self.__class__
-        obj = cls.__new__(cls)
+        return self._copy()
+
+    def _copy(self, copy_on_write=False):
+        copies = {}
 
         def copy_aux(obj):
 
             if isinstance(obj, Expression):
-                return copy.copy(obj)
+                return copies[id(obj)]
             else:
                 return obj
 
-        new__dict__ = tree.map_structure(copy_aux, self.__dict__)
-        obj.__dict__.update(new__dict__)
-
-        return obj
+        states = {}
+        # the cached index tells which sub-expressions do not depend on variables
+        dependents = self._variable_index().dependents if copy_on_write else None
+
+        def children(node):
+            if dependents is not None and id(node) not in dependents:
+                return []
+            state = states[id(node)] = _getstate(node)
+            return [o for o in tree.flatten(list(state.values())) if isinstance(o, Expression)]
+
+        # sub-expressions are copied first and shared sub-expressions are copied once
+        for node in _walk(self, children, post_order=True):
+            if id(node) not in states:
+                # sub-expressions without variables are shared
+                copies[id(node)] = node
+                continue
+
+            state = states.pop(id(node))
+            cls = node.__class__
+            obj = cls.__new__(cls)
+            for name, value in state.items():
+                if isinstance(value, Expression):
+                    state[name] = copies[id(value)]
+                elif tree.is_nested(value):
+                    state[name] = tree.map_structure(copy_aux, value)
+            _setstate(obj, state)
+            copies[id(node)] = obj
+
+        return copies[id(self)]
 
     def __deepcopy__(self, memo):
         cls = self.__class__
         obj = cls.__new__(cls)
         memo[id(self)] = obj
-        obj.__dict__.update(copy.deepcopy(self.__dict__))
+        _setstate(obj, copy.deepcopy(_getstate(self)))
         return obj
 
-    def clone(self, deep=False):
+    def clone(self, deep=False, copy_on_write=False):
+        """Clone the ``Expression``-tree.
+
+        Args:
+            deep (bool, optional): deep copy the tree, including the constants and objects it holds. Defaults to ``False`` to only copy the nodes.
+            copy_on_write (bool, optional): only copy the variables and the nodes depending on them, the other sub-expressions as well as the constants and objects they hold are shared with the tree. The cost of the clone does not depend on the size of these constants. Shared sub-expressions must not be modified. Defaults to ``False``.
+
+        Raises:
+            ValueError: if both ``deep`` and ``copy_on_write`` are set.
+
+        Returns:
+            (Expression): the clone.
+        """
+        if deep and copy_on_write:
+            raise ValueError("a clone cannot be both deep and copy-on-write")
         if deep:
             c = copy.deepcopy(self)
+        elif copy_on_write:
+            c = self._copy(copy_on_write=True)
         else:
             c = copy.copy(self)
         return c
 
+    def to_bytes(self) -> bytes:
+        """Encode the ``Expression``-tree into a compact and versioned binary format, see ``Expression.from_bytes``.
+
+        Shared sub-expressions are encoded once and importable functions and classes (including the ones transformed with ``meta``) are encoded by their import path. Other constants are pickled. Memoization caches are not encoded.
+
+        Returns:
+            (bytes): the encoded expression.
+        """
+        from ._serialization import dumps
+
+        return dumps(self)
+
+    @staticmethod
+    def from_bytes(data: bytes):
+        """Decode an ``Expression``-tree encoded with ``Expression.to_bytes``.
+
+        Args:
+            data (bytes): the encoded expression.
+
+        Raises:
+            ValueError: if ``data`` is not an encoded expression or its format version is not supported.
+
+        Returns:
+            (Expression): the decoded expression.
+        """
+        from ._serialization import loads
+
+        return loads(data)
+
+    def _memoize(self, max_size: int = 128, max_bytes: int = None, cache: ResultCache = None):
+        """Cache the results of the expression, see ``memoize``."""
+        self._cache = ResultCache(max_size, max_bytes) if cache is None else cache
+        self._cache_token = next(_CACHE_TOKENS)
+        self._cache_variables = tuple(self.variables().keys())
+        # plans including the expression must look up the cache
+        self._invalidate()
+        return self
+
+    def _cache_key_of(self, choice: dict):
+        key = (self._cache_token, tuple(choice.get(var_id) for var_id in self._cache_variables))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def fingerprint(self) -> str:
+        """Compute a structural hash of the ``Expression``-tree.
+
+        Two trees with the same structure, operators, variables and constants have the same fingerprint whatever the frozen values of their variables. It is stable across processes when constants are literals, arrays or importable functions and classes, and can be used as a key where expressions cannot (``__eq__`` builds a ``BinaryExpression``).
+
+        Returns:
+            (str): the hexadecimal fingerprint.
+        """
+        memo = {}
+        # sub-expressions are hashed first so that _digest does not recurse
+        for node in _walk(self, lambda node: node._children(), post_order=True):
+            _digest(node, memo)
+        return memo[id(self)].hex()
+
+    def _structure(self):
+        """Return the ``(name, value)`` pairs defining the structure of the expression."""
+        return sorted(self._items())
+
+    def compile(self):
+        """Lower the ``Expression``-tree into a flat evaluation plan.
+
+        The plan can be evaluated many times with different choices without cloning or freezing the ``Expression``-tree which is left untouched. It is cached, like the index of the variables, until the tree is modified so that ``evaluate(choice)`` lowers the tree once.
+
+        This method hides the ``compile`` attribute of wrapped objects (e.g., ``keras.Model.compile``), access it with ``ExpressionAttributeAccess(model, "compile")(...)`` instead of ``model.compile(...)``.
+
+        Returns:
+            (CompiledExpression): the evaluation plan of the expression.
+        """
+        plan = self._plan
+        if plan is None:
+            # the index links the nodes to their parents so that modifying any
+            # of them drops the plan
+            self._variable_index()
+            plan = _Compiler().build(self)
+            self._plan = plan
+        return plan
+
+    def _compile(self, compiler):
+        """Emit the instructions evaluating the current expression and return the register of its result."""
+        # expressions without a dedicated instruction are evaluated on a frozen copy
+        return compiler.emit("evaluate", self)
+
 
 class BinaryExpression(Expression):
     """left 'operation' right"""
 
+    __slots__ = _fields = ("left", "operator", "right")
+
     def __init__(self, left, right, operator):
         self.left = left
         self.right = right
@@ -242,20 +664,26 @@ class BinaryExpression(Expression):
     def __repr__(self) -> str:
         return f"{self.left} {self.operator} {self.right}"
 
-    def evaluate(self):
+    def _evaluate(self):
 
         self.evaluate_children()
 
-        operator_implementation = getattr(
-            self.left, BIN_OPS_SYNTAX_2_ATTR[self.operator]
-        )
+        return BIN_OPS_SYNTAX_2_FUNC[self.operator](self.left, self.right)
 
-        return operator_implementation(self.right)
+    def _compile(self, compiler):
+        return compiler.emit(
+            "binary_op",
+            BIN_OPS_SYNTAX_2_FUNC[self.operator],
+            compiler.lower(self.left),
+            compiler.lower(self.right),
+        )
 
 
 class UnaryExpression(Expression):
     """operation x"""
 
+    __slots__ = _fields = ("operator", "x")
+
     def __init__(self, operator, x):
         self.operator = operator
         self.x = x
@@ -263,16 +691,34 @@ class UnaryExpression(Expression):
     def __repr__(self) -> str:
         return f"{self.operator}{self.x}"
 
-    def evaluate(self):
+    def _evaluate(self):
         self.evaluate_children()
 
-        operator_implementation = getattr(
-            self.x, UNA_OPS_SYNTAX_2_ATTR[self.operator])
+        return UNA_OPS_SYNTAX_2_FUNC[self.operator](self.x)
+
+    def _compile(self, compiler):
+        return compiler.emit(
+            "unary_op", UNA_OPS_SYNTAX_2_FUNC[self.operator], compiler.lower(self.x)
+        )
+
 
-        return operator_implementation()
+def _call_function(function_parent, function, args, kwargs):
+    """Call ``function`` the way ``FunctionCallExpression`` does once its children are evaluated."""
+    if function_parent:
+        if function.__name__ == "__init__":
+            # function_parent is a class by using the syntax
+            # class(*args, **kwargs) we call __init__
+            return function_parent(*args, **kwargs)
+        else:
+            return function(function_parent, *args, **kwargs)
+    else:
+        return function(*args, **kwargs)
 
 
 class FunctionCallExpression(Expression):
+
+    __slots__ = _fields = ("args", "function", "function_parent", "kwargs")
+
     def __init__(self, function_parent, function, *args, **kwargs) -> None:
         self.function_parent = function_parent
         self.function = function
@@ -300,27 +746,25 @@ class FunctionCallExpression(Expression):
             f"{prefix}{'.' if prefix and fname != '' else ''}{fname}({args + kwargs})"
         )
 
-    def evaluate(self):
-
-        res = self._evaluate()
-        return res
-
     def _evaluate(self):
 
         self.evaluate_children()
 
-        if self.function_parent:
-            if self.function.__name__ == "__init__":
-                # self.function_parent is a class by using the syntax
-                # class(*args, **kwargs) we call __init__
-                return self.function_parent(*self.args, **self.kwargs)
-            else:
-                return self.function(self.function_parent, *self.args, **self.kwargs)
-        else:
-            return self.function(*self.args, **self.kwargs)
+        return _call_function(self.function_parent, self.function, self.args, self.kwargs)
+
+    def _compile(self, compiler):
+        return compiler.emit(
+            "call_function",
+            compiler.lower(self.function_parent),
+            compiler.lower(self.function),
+            *compiler.lower_arguments(self.args, self.kwargs),
+        )
 
 
 class ExpressionItemAccess(Expression):
+
+    __slots__ = _fields = ("expression", "item")
+
     def __init__(self, expression, item):
         self.expression = expression
         self.item = item
@@ -328,13 +772,21 @@ class ExpressionItemAccess(Expression):
     def __repr__(self) -> str:
         return f"{self.expression}[{self.item}]"
 
-    def evaluate(self):
+    def _evaluate(self):
         self.evaluate_children()
 
         return self.expression[self.item]
 
+    def _compile(self, compiler):
+        return compiler.emit(
+            "getitem", compiler.lower(self.expression), compiler.lower(self.item)
+        )
+
 
 class ExpressionAttributeAccess(Expression):
+
+    __slots__ = _fields = ("expression", "name")
+
     def __init__(self, expression, name):
         self.expression = expression
         self.name = name
@@ -342,13 +794,19 @@ class ExpressionAttributeAccess(Expression):
     def __repr__(self) -> str:
         return f"{self.expression}.{self.name}"
 
-    def evaluate(self):
+    def _evaluate(self):
         self.evaluate_children()
 
         return getattr(self.expression, self.name)
 
+    def _compile(self, compiler):
+        return compiler.emit("getattr", compiler.lower(self.expression), self.name)
+
 
 class ExpressionCallExpression(Expression):
+
+    __slots__ = _fields = ("args", "expression", "kwargs")
+
     def __init__(self, expression, *args, **kwargs) -> None:
         self.expression = expression
         self.args = list(args)
@@ -368,53 +826,35 @@ class ExpressionCallExpression(Expression):
 
         return f"{self.expression}({args + kwargs})"
 
-    def choices(self):
-        memo = self.expression.choices()
-
-        def choice_aux(o):
-
-            if isinstance(o, Expression):
-
-                if isinstance(o, VarExpression):
-                    memo[o.id] = o
-                else:
-                    memo.update(o.choices())
-
-            return memo
-
-        tree.map_structure(choice_aux, self.args)
-        tree.map_structure(choice_aux, self.kwargs)
-
-        return memo
-
-    def freeze(self, choice: dict):
-
-        self.expression.freeze(choice)
-
-        # propagate the materialization
-        def freeze_aux(o):
-
-            if isinstance(o, Expression):
-                o.freeze(choice)
-
-        tree.map_structure(freeze_aux, self.args)
-        tree.map_structure(freeze_aux, self.kwargs)
-
-    def evaluate(self):
+    def _evaluate(self):
 
         self.evaluate_children()
 
         return self.expression(*self.args, **self.kwargs)
 
+    def _compile(self, compiler):
+        return compiler.emit(
+            "call",
+            compiler.lower(self.expression),
+            *compiler.lower_arguments(self.args, self.kwargs),
+        )
+
 
 class ObjectExpression(Expression):
+
+    # _call_cache is the cache shared by the memoized calls of the object, see
+    # memoize
+    __slots__ = ("_obj", "_call_cache")
+    _fields = ("_obj",)
+
     def __init__(self, obj):
         self._obj = obj
+        self._call_cache = None
 
     def __call__(self, *args, **kwargs):
 
         if inspect.isclass(self._obj):
-            return FunctionCallExpression(
+            call = FunctionCallExpression(
                 self._obj,
                 self._obj.__init__,
                 *args,
@@ -423,42 +863,167 @@ class ObjectExpression(Expression):
         elif inspect.isfunction(self._obj) or (
             inspect.isbuiltin(self._obj) and not (inspect.ismethod(self._obj))
         ):
-            return FunctionCallExpression(
+            call = FunctionCallExpression(
                 None,  # a function does not have a parent (stateless)
                 self._obj,
                 *args,
                 **kwargs,
             )
         else:
-            return FunctionCallExpression(
+            call = FunctionCallExpression(
                 self._obj,
                 self._obj.__call__,
                 *args,
                 **kwargs,
             )
 
+        if self._call_cache is not None:
+            call._memoize(cache=self._call_cache)
+
+        return call
+
+    def _memoize(self, max_size: int = 128, max_bytes: int = None, cache: ResultCache = None):
+        """Memoize the calls of the object created from now on, see ``memoize``."""
+        self._call_cache = ResultCache(max_size, max_bytes) if cache is None else cache
+        return self
+
     def __repr__(self):
         try:
             return self._obj.__repr__()
         except:
             return str(self._obj)
 
-    def evaluate(self):
+    def _evaluate(self):
         self.evaluate_children()
 
         return self._obj
 
+    def _compile(self, compiler):
+        return compiler.lower(self._obj)
+
+
+def memoize(expression, max_size: int = 128, max_bytes: int = None, cache: ResultCache = None):
+    """Cache the results of an expression keyed by the values of the variables it depends on.
+
+    When these values are unchanged the result is reused across evaluations, and clones, of the expression without evaluating its sub-expressions. For an ``ObjectExpression`` (e.g., a class transformed by ``meta``) the calls of the object created from now on are memoized and share the same cache.
+
+    It is a function rather than a method so that ``expression.memoize`` remains an attribute of the wrapped object.
+
+    .. code-block:: python
+
+        data = mpy.memoize(load(mpy.Int(1, 10)))
+
+    Args:
+        expression (Expression): the expression to memoize.
+        max_size (int, optional): the maximum number of cached results. Defaults to ``128``.
+        max_bytes (int, optional): the maximum total size in bytes of cached results. Defaults to ``None`` for unbounded.
+        cache (ResultCache, optional): a cache shared with other expressions. Defaults to ``None`` to create a new one bounded by ``max_size`` and ``max_bytes``.
+
+    Returns:
+        (Expression): the memoized expression.
+    """
+    return expression._memoize(max_size, max_bytes, cache)
+
+
+def invalidate(expression):
+    """Drop the cached index of the variables and evaluation plan of an expression and of its ancestors, after in-place modifications of containers held by its nodes (e.g., ``args.append(...)``).
+
+    Args:
+        expression (Expression): the modified expression.
+    """
+    expression._invalidate()
+
+
+# stack of the scopes entered in the current context, variables are created in
+# the last one, see Scope
+_SCOPES = contextvars.ContextVar("metalgpy_scopes", default=())
+# prefix of the ids of the variables of unnamed scopes, distinct from the ids of
+# the global counter
+_UNNAMED_SCOPE = "~"
+# lock of the global counter VarExpression.var_id
+_VAR_ID_LOCK = threading.Lock()
+
+
+def _current_scope():
+    """Return the innermost ``Scope`` entered in the current context or ``None``."""
+    scopes = _SCOPES.get()
+    return scopes[-1] if scopes else None
+
+
+class Scope:
+    """A namespace of variable ids with its own counter.
+
+    Variables created in a ``with Scope():`` block (in the current thread or asyncio task) get consecutive numbers starting from ``start`` whatever is built concurrently elsewhere, so that spaces built in parallel have deterministic ids. The ids of unnamed variables are ``"<name>.<n>"`` for a named scope and ``"~.<n>"`` for an unnamed scope, so that they never clash with the ids ``"<n>"`` of variables created outside of scopes. The ids of named variables are their name. A named scope created in another named scope is nested in its name, an unnamed scope created in another scope numbers its variables with the counter of its parent.
+
+    .. code-block:: python
+
+        with mpy.Scope("model"):
+            units = mpy.Int(16, 128)  # id "model.0"
+
+    Args:
+        name (str, optional): the prefix of the ids of unnamed variables. Defaults to ``None`` for ids ``"~.<n>"``.
+        start (int, optional): the first number of the scope. Defaults to ``0``.
+
+    Raises:
+        ValueError: if ``start`` is given to an unnamed scope created in another scope.
+    """
+
+    def __init__(self, name: str = None, start: int = 0):
+        parent = _current_scope()
+        # scope allocating the numbers of the variables
+        self._parent = None
+        if parent is not None and name is None:
+            if start != 0:
+                raise ValueError("an unnamed scope created in another scope is numbered by its parent and has no start")
+            self._parent = parent
+            name = parent.name
+        elif parent is not None and parent.name is not None:
+            name = f"{parent.name}.{name}"
+        self.name = name
+        self._counter = itertools.count(start)
+        self._lock = threading.Lock()
+
+    @property
+    def _prefix(self) -> str:
+        """The prefix of the ids of the unnamed variables of the scope."""
+        return _UNNAMED_SCOPE if self.name is None else self.name
+
+    def __enter__(self):
+        # the stack is a value of the context (e.g., of each asyncio task) and is never mutated
+        _SCOPES.set(_SCOPES.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _SCOPES.set(_SCOPES.get()[:-1])
+
+    def __repr__(self) -> str:
+        return f"Scope(name={self.name!r})"
+
+    def allocate(self) -> int:
+        """Return the next number of the scope."""
+        if self._parent is not None:
+            return self._parent.allocate()
+        with self._lock:
+            return next(self._counter)
+
 
 class VarExpression(Expression):
 
     value = None
     var_id = 0
+    _scope_name = None
 
     def __init__(self, name: str = None) -> None:
         super().__init__()
         self._name = name
-        self.var_id = VarExpression.var_id
-        VarExpression.var_id += 1
+        scope = _current_scope()
+        if scope is None:
+            with _VAR_ID_LOCK:
+                self.var_id = VarExpression.var_id
+                VarExpression.var_id += 1
+        else:
+            self.var_id = scope.allocate()
+            self._scope_name = scope._prefix
 
     def __eq__(self, other):
         return type(self) is type(other) and self.value == other.value
@@ -487,13 +1052,30 @@ class VarExpression(Expression):
     def id(self):
         if self._name:
             return self._name
+        elif self._scope_name:
+            return f"{self._scope_name}.{self.var_id}"
         else:
             return str(self.var_id)
 
-    def freeze(self, choice: dict):
-        self.value = choice[self.id]
+    def _freeze(self, choice: dict):
+        self.value = self._resolve(choice)
+        return []
+
+    def _resolve(self, choice: dict):
+        """Return the value of the variable for ``choice`` without modifying the variable."""
+        return choice[self.id]
+
+    def _choice_of(self, value):
+        """Return the choice resolved to ``value``, the inverse of ``_resolve``."""
+        if value is None:
+            raise ValueError(f"variable {self.id} is not frozen, give a choice to evaluate the expression")
+        return value
+
+    def _resolve_batch(self, choices):
+        """Return the values of the variable for a batch of ``choices`` as an array."""
+        return np.asarray(choices[self.id])
 
-    def evaluate(self):
+    def _evaluate(self):
         if isinstance(self.value, Expression):
             return self.value.evaluate()
         elif tree.is_nested(self.value):
@@ -503,8 +1085,11 @@ class VarExpression(Expression):
         else:
             return self.value
 
-    def choices(self):
-        return {self.id: self}
+    def _structure(self):
+        return [("id", self.id)] + super()._structure()
+
+    def _compile(self, compiler):
+        return compiler.emit("load_var", self, None)
 
 
 class List(VarExpression):
@@ -521,7 +1106,13 @@ class List(VarExpression):
         super().__init__(name=name)
         self._values = list(values)
         self._ordered = ordered
-        self._dist = (scipy.stats.randint, {"low": 0, "high": self._length()})
+
+    @property
+    def _dist(self):
+        # scipy.stats is slow to import and only needed to sample
+        import scipy.stats
+
+        return (scipy.stats.randint, {"low": 0, "high": self._length()})
 
     def __repr__(self) -> str:
         # return empty string notation if there aren't any values
@@ -560,29 +1151,49 @@ class List(VarExpression):
             and self._ordered == other._ordered
         )
 
-    def freeze(self, choice: dict):
-        # obtain the index of intended frozen choice
-        idx = int(choice[self.id])
+    def _resolve(self, choice: dict):
+        return self._getitem(int(choice[self.id]))
+
+    def _choice_of(self, value):
+        # the frozen value is the chosen object of the values
+        for i, value_i in enumerate(self._values):
+            if value_i is value:
+                return i
+        raise ValueError(f"variable {self.id} is not frozen, give a choice to evaluate the expression")
+
+    def _resolve_batch(self, choices):
+        idx = np.asarray(choices[self.id]).astype(int)
+        return np.asarray(self._values)[idx]
 
+    def _compile(self, compiler):
+        # the chosen value is evaluated only if it is selected
+        branches = [compiler.lower_branch(value) if _contains_expression(value) else None for value in self._values]
+        if all(branch is None for branch in branches):
+            branches = None
+        return compiler.emit("load_var", self, branches)
+
+    def _freeze(self, choice: dict):
         # obtain value of a single item
-        self.value = self._getitem(idx)
+        self.value = self._resolve(choice)
 
-        # freeze the list of choices
-        if isinstance(idx, collections.abc.Iterable):
-            for i in idx:
-                if isinstance(self.value[i], Expression):
-                    self.value[i].freeze(choice)
-        else:
-            if isinstance(self.value, Expression):
-                self.value.freeze(choice)
+        # freeze the chosen value
+        return [o for o in tree.flatten(self.value) if isinstance(o, Expression)]
 
     def child_choices(self):
+        """Retrieve the variables activated by each value of the ``List``, i.e., the variables not nested in other variables of the value.
+
+        Returns:
+            (dict): a dictionnary where keys are the index of values containing expressions and values are dict of variables as returned by ``choices()``.
+        """
         memo = {}
 
-        for i in range(len(self)):
-            value_i = self._getitem(i)
-            if isinstance(value_i, Expression):
-                memo[value_i.id] = value_i.choices()
+        for i in range(self._length()):
+            choices = {}
+            for value_i in tree.flatten(self._getitem(i)):
+                if isinstance(value_i, Expression):
+                    choices.update(value_i._choices())
+            if choices:
+                memo[i] = choices
 
         return memo
 
@@ -611,7 +1222,12 @@ class Int(VarExpression):
         super().__init__(name=name)
         self._low = low
         self._high = high
-        self._dist = (scipy.stats.randint, {"low": self._low, "high": self._high + 1})
+
+    @property
+    def _dist(self):
+        import scipy.stats
+
+        return (scipy.stats.randint, {"low": self._low, "high": self._high + 1})
 
     def __repr__(self) -> str:
         if not (self.value is None):
@@ -623,7 +1239,7 @@ class Int(VarExpression):
         b = super().__eq__(other)
         return b and self._high == other._upper and self._low == other._lower
 
-    def freeze(self, choice: dict):
+    def _resolve(self, choice: dict):
 
         choice = choice[self.id]
 
@@ -635,7 +1251,21 @@ class Int(VarExpression):
                 raise ValueError(
                     f"choice for variable {self} should be between [{self._low}, {self._high}] but is {choice}"
                 )
-        self.value = int(choice)
+        return int(choice)
+
+    def _resolve_batch(self, choices):
+
+        choices = np.asarray(choices[self.id])
+
+        if not (
+            isinstance(self._low, VarExpression)
+            or isinstance(self._high, VarExpression)
+        ):
+            if np.any(self._low > choices) or np.any(choices > self._high):
+                raise ValueError(
+                    f"choices for variable {self} should be between [{self._low}, {self._high}]"
+                )
+        return choices.astype(int)
 
 class Float(VarExpression):
     """Defines a continuous variable.
@@ -649,7 +1279,12 @@ class Float(VarExpression):
         super().__init__(name=name)
         self._low = low
         self._high = high
-        self._dist = (scipy.stats.uniform, {"loc": self._low, "scale": self._high - self._low})
+
+    @property
+    def _dist(self):
+        import scipy.stats
+
+        return (scipy.stats.uniform, {"loc": self._low, "scale": self._high - self._low})
 
     def __repr__(self) -> str:
         if not (self.value is None):
@@ -661,7 +1296,7 @@ class Float(VarExpression):
         b = super().__eq__(other)
         return b and self._high == other._upper and self._low == other._lower
 
-    def freeze(self, choice):
+    def _resolve(self, choice: dict):
 
         choice = choice[self.id]
 
@@ -673,6 +1308,913 @@ class Float(VarExpression):
                 raise ValueError(
                     f"choice for variable {self} should be between [{self._low}, {self._high}] but is {choice}"
                 )
-        self.value = float(choice)
+        return float(choice)
+
+    def _resolve_batch(self, choices):
+
+        choices = np.asarray(choices[self.id])
+
+        if not (
+            isinstance(self._low, VarExpression)
+            or isinstance(self._high, VarExpression)
+        ):
+            if np.any(self._low > choices) or np.any(choices > self._high):
+                raise ValueError(
+                    f"choices for variable {self} should be between [{self._low}, {self._high}]"
+                )
+        return choices.astype(float)
+
+
+def _walk(root, children, post_order=False):
+    """Iterate over the expressions reachable from ``root`` with an explicit stack.
+
+    Each expression is visited once, in pre-order or in post-order (children first), so that deep trees do not hit the recursion limit and shared sub-expressions are not visited twice.
+
+    Args:
+        root (Expression): the expression where the traversal starts.
+        children (callable): a function returning the sub-expressions of an expression in order. It is called once per expression when the expression is reached.
+        post_order (bool, optional): if ``True`` expressions are yielded after their sub-expressions. Defaults to ``False``.
+
+    Yields:
+        Expression: the visited expressions.
+    """
+    visited = set()
+    stack = [(root, False)]
+
+    while stack:
+        node, expanded = stack.pop()
+
+        if expanded:
+            yield node
+            continue
+
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+
+        node_children = children(node)
+
+        if post_order:
+            stack.append((node, True))
+        else:
+            yield node
+
+        stack.extend((child, False) for child in reversed(node_children))
+
+
+# slots of expression classes which are part of their state, by class
+_SLOTS = {}
+
+
+def _slots(cls) -> tuple:
+    if cls not in _SLOTS:
+        names = []
+        for base in reversed(cls.__mro__):
+            slots = base.__dict__.get("__slots__", ())
+            names.extend([slots] if isinstance(slots, str) else slots)
+        _SLOTS[cls] = tuple(
+            name
+            for name in names
+            if name not in ("__weakref__", "__dict__", "_index", "_parents", "_plan")
+        )
+    return _SLOTS[cls]
+
+
+def _instance_dict(expression):
+    """Return the ``__dict__`` of an expression or ``None`` if its class only has slots."""
+    try:
+        return object.__getattribute__(expression, "__dict__")
+    except AttributeError:
+        return None
+
+
+def _getstate(expression) -> dict:
+    """Return the attributes of an expression, from its slots and ``__dict__``, without its index bookkeeping."""
+    state = {}
+    for name in _slots(type(expression)):
+        try:
+            state[name] = object.__getattribute__(expression, name)
+        except AttributeError:
+            pass
+    attrs = _instance_dict(expression)
+    if attrs:
+        state.update(attrs)
+    return state
+
+
+def _setstate(expression, state: dict):
+    """Set the attributes of an expression from ``state`` and invalidate its index once."""
+    for name, value in state.items():
+        object.__setattr__(expression, name, value)
+    expression._invalidate()
+
+
+class VariableIndex:
+    """The index of the variables of an ``Expression``-tree, see ``Expression._variable_index()``.
+
+    Building the index registers weak references from each node to its parents so that structural modifications of any node invalidate the index.
+
+    Args:
+        expression (Expression): the root of the tree.
+
+    Attributes:
+        variables (dict): all the variables of the tree, as returned by ``Expression.variables()``.
+        choices (dict): the variables not nested in other variables, as returned by ``Expression.choices()``.
+        position (dict): the position of each variable ``id`` in ``variables`` (e.g., the column of flat samples).
+        parents (dict): the expressions directly holding each variable ``id``.
+        dependents (set): the ``id`` of the expressions depending on variables, including the variables.
+    """
+
+    def __init__(self, expression):
+        self.variables = expression._variables()
+        self.choices = expression._choices()
+        self.position = {var_id: i for i, var_id in enumerate(self.variables)}
+        self.parents = collections.defaultdict(list)
+        self.dependents = set()
+
+        children = {}
+
+        def children_aux(node):
+            children[id(node)] = node._children()
+            return children[id(node)]
+
+        # register parent links of all the nodes of the tree
+        for node in _walk(expression, children_aux, post_order=True):
+            for child in children[id(node)]:
+                if child._parents is None:
+                    child._parents = {}
+                child._parents[id(node)] = weakref.ref(node)
+                if isinstance(child, VarExpression):
+                    self.parents[child.id].append(node)
+            if isinstance(node, VarExpression) or any(
+                id(child) in self.dependents for child in children[id(node)]
+            ):
+                self.dependents.add(id(node))
+        self.parents = dict(self.parents)
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __repr__(self) -> str:
+        return f"VariableIndex(variables={list(self.variables)})"
+
+
+def _qualname(obj):
+    return f"{getattr(obj, '__module__', None)}.{obj.__qualname__}"
+
+
+def _digest(obj, memo: dict) -> bytes:
+    """Compute the structural digest of ``obj`` where ``memo`` maps ``id`` of expressions to their digest."""
+    if isinstance(obj, Expression):
+        key = id(obj)
+        if key not in memo:
+            h = hashlib.blake2b(_qualname(type(obj)).encode(), digest_size=16)
+            for name, value in obj._structure():
+                h.update(name.encode())
+                h.update(_digest(value, memo))
+            memo[key] = h.digest()
+        return memo[key]
+
+    h = hashlib.blake2b(_qualname(type(obj)).encode(), digest_size=16)
+    if isinstance(obj, (list, tuple)):
+        for o in obj:
+            h.update(_digest(o, memo))
+    elif isinstance(obj, dict):
+        # the order of keyword arguments does not matter
+        for item in sorted(_digest(k, memo) + _digest(v, memo) for k, v in obj.items()):
+            h.update(item)
+    elif isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(repr(obj).encode())
+    elif inspect.ismethod(obj):
+        h.update(_digest(obj.__self__, memo))
+        h.update(_digest(obj.__func__, memo))
+    elif isinstance(getattr(obj, "__qualname__", None), str) and "<" not in obj.__qualname__:
+        # importable functions and classes are referenced by their path
+        h.update(_qualname(obj).encode())
+    else:
+        # other objects (e.g., instances, lambdas) are only identified in the current process
+        h.update(str(id(obj)).encode())
+    return h.digest()
+
+
+def _call_name(node) -> str:
+    """Return the name of the function called by a call ``Expression``."""
+    if isinstance(node, FunctionCallExpression):
+        if node.function_parent and node.function.__name__ == "__init__":
+            return getattr(node.function_parent, "__qualname__", repr(node.function_parent))
+        return getattr(node.function, "__qualname__", repr(node.function))
+    elif isinstance(node.expression, (FunctionCallExpression, ExpressionCallExpression)):
+        return f"{_call_name(node.expression)}.__call__"
+    return "__call__"
+
+
+def _call_stacks(root) -> dict:
+    """Return the names of the enclosing calls, from the outermost one, and the fingerprint of each call of an ``Expression``-tree by ``id``."""
+    parents = {}
+
+    def children(node):
+        nodes = node._children()
+        for child in nodes:
+            parents.setdefault(id(child), node)
+        return nodes
+
+    nodes = list(_walk(root, children, post_order=True))
+    memo = {}
+    for node in nodes:
+        _digest(node, memo)
+
+    # parents come before their sub-expressions in reversed post-order
+    prefixes = {}
+    stacks = {}
+    for node in reversed(nodes):
+        parent = parents.get(id(node))
+        stack = () if parent is None else prefixes[id(parent)]
+        if isinstance(node, (FunctionCallExpression, ExpressionCallExpression)):
+            stack = stack + (_call_name(node),)
+            stacks[id(node)] = (stack, memo[id(node)].hex())
+        prefixes[id(node)] = stack
+    return stacks
+
+
+class InternTable:
+    """A table of unique ``Expression``-trees indexed by fingerprint (hash-consing).
+
+    Interning an expression replaces its identical sub-expressions by a single instance shared in memory, also with expressions previously interned in the same table.
+    """
+
+    def __init__(self):
+        self._expressions = {}
+
+    def __len__(self):
+        return len(self._expressions)
+
+    def __contains__(self, expression):
+        return expression.fingerprint() in self._expressions
+
+    def __getitem__(self, fingerprint: str):
+        return self._expressions[fingerprint]
+
+    def intern(self, expression):
+        """Intern ``expression`` and its sub-expressions in place.
+
+        Args:
+            expression (Expression): the expression to intern.
+
+        Returns:
+            (Expression): the unique instance of the table structurally identical to ``expression``.
+        """
+        memo = {}
+        canonicals = {}
+
+        def intern_aux(o):
+
+            if isinstance(o, Expression):
+                return canonicals[id(o)]
+            return o
+
+        # sub-expressions are interned first
+        for node in _walk(expression, lambda node: node._children(), post_order=True):
+            for k, v in node._items():
+                setattr(node, k, tree.map_structure(intern_aux, v))
+
+            fingerprint = _digest(node, memo)
+            canonical = self._expressions.setdefault(fingerprint.hex(), node)
+            memo[id(canonical)] = fingerprint
+            canonicals[id(node)] = canonical
+
+        return canonicals[id(expression)]
+
+
+def _contains_expression(obj):
+    """Check if ``obj`` is an ``Expression`` or a nested structure containing one."""
+    if isinstance(obj, Expression):
+        return True
+    elif isinstance(obj, (list, tuple)):
+        return any(_contains_expression(o) for o in obj)
+    elif isinstance(obj, dict):
+        return any(_contains_expression(o) for o in obj.values())
+    return False
+
+
+# opcode, register where the result is stored, operands (mostly registers)
+Instruction = collections.namedtuple("Instruction", ["opcode", "target", "args"])
+
+
+def _operands(opcode: str, args: tuple) -> list:
+    """Return the registers read by an instruction."""
+    if opcode == "call_function":
+        function_parent, function, arguments, keywords = args
+        return [function_parent, function, *arguments, *(i for _, i in keywords)]
+    elif opcode == "call":
+        function, arguments, keywords = args
+        return [function, *arguments, *(i for _, i in keywords)]
+    elif opcode == "binary_op":
+        return [args[1], args[2]]
+    elif opcode == "unary_op":
+        return [args[1]]
+    elif opcode == "getitem":
+        return list(args)
+    elif opcode == "getattr":
+        return [args[0]]
+    elif opcode == "build":
+        return [i for _, i in args[1]] if issubclass(args[0], dict) else list(args[1])
+    return []
+
+
+class CompiledExpression:
+    """A flat evaluation plan of an ``Expression``-tree returned by ``Expression.compile()``.
+
+    Instructions are topologically ordered and each of them stores its result in a register. Constants of the ``Expression``-tree are stored in the initial registers. A node shared by several parents is evaluated once per run, including when it is shared with the branches of ``List`` variables or the body of memoized expressions.
+
+    The bodies of branches and of memoized expressions are ranges of instructions of the plan which are executed only when the branch is selected or the cache misses. ``order`` lists the instructions executed in every run.
+
+    Args:
+        instructions (list): the list of ``Instruction`` in topological order.
+        registers (list): the initial values of the registers.
+        output (int): the register holding the result of the plan.
+        expression (Expression, optional): the compiled ``Expression``-tree. Defaults to ``None``.
+        sources (list, optional): the ``Expression`` lowered into each instruction, used to profile the evaluation. Defaults to ``None``.
+    """
+
+    def __init__(self, instructions, registers, output, expression=None, sources=None):
+        self.instructions = instructions
+        self.registers = registers
+        self.output = output
+        self.expression = expression
+        self.sources = sources
+        # register -> index of the instruction writing it
+        self._writer = {target: i for i, (_, target, _) in enumerate(instructions)}
+        self.order = _needs(instructions, self._writer, output)
+        self._operand_instructions = None
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression(instructions={len(self)}, output={self.output})"
+
+    def evaluate(self, choice: dict = None, executor=None):
+        """Evaluate the plan.
+
+        Args:
+            choice (dict, optional): the values of the variables where keys are variable ``id``. Defaults to ``None`` for an expression without variables.
+            executor (concurrent.futures.Executor, optional): an executor running the independent function calls of the plan concurrently (e.g., ``ThreadPoolExecutor``, a ``ProcessPoolExecutor`` requires picklable functions and arguments). Defaults to ``None`` to run them sequentially.
+
+        Returns:
+            (any): the result of the evaluation.
+        """
+        if choice is None:
+            choice = {}
+
+        if executor is not None:
+            return self._evaluate_concurrently(choice, executor)
+
+        if _EVALUATION_HOOKS and self.expression is not None:
+            return self._evaluate_traced(
+                choice, list(_EVALUATION_HOOKS), _call_stacks(self.expression)
+            )
+
+        r = self.registers.copy()
+        instructions = self.instructions
+        execute = self._execute
+        done = set()
+
+        def run_plan(output, needs):
+            for i in needs:
+                if i not in done:
+                    done.add(i)
+                    opcode, target, args = instructions[i]
+                    r[target] = execute(opcode, args, r, choice, run_plan)
+            return r[output]
+
+        return run_plan(self.output, self.order)
+
+    def _evaluate_traced(self, choice: dict, hooks: list, stacks: dict):
+        """Evaluate the plan and call ``hooks`` after each function call, ``stacks`` maps the ``id`` of calls to their stack and fingerprint."""
+        r = self.registers.copy()
+        done = set()
+
+        def run_plan(output, needs):
+            for i in needs:
+                if i in done:
+                    continue
+                done.add(i)
+                opcode, target, args = self.instructions[i]
+                source = self.sources[i] if self.sources else None
+                # a memoized call is recorded by the call of its body, on cache misses
+                if opcode != "cached" and id(source) in stacks:
+                    start = time.perf_counter()
+                    r[target] = self._execute(opcode, args, r, choice, run_plan)
+                    elapsed = time.perf_counter() - start
+                    stack, fingerprint = stacks[id(source)]
+                    for hook in hooks:
+                        hook(stack, fingerprint, elapsed, r[target])
+                else:
+                    r[target] = self._execute(opcode, args, r, choice, run_plan)
+            return r[output]
+
+        return run_plan(self.output, self.order)
+
+    def _execute(self, opcode, args, r, choice, run_plan):
+        """Return the result of an instruction given the registers ``r``, the bodies of branches and memoized expressions are executed with ``run_plan(output, needs)``."""
+        if opcode == "call_function":
+            function_parent, function, arguments, keywords = args
+            return _call_function(
+                r[function_parent],
+                r[function],
+                [r[i] for i in arguments],
+                {k: r[i] for k, i in keywords},
+            )
+        elif opcode == "call":
+            function, arguments, keywords = args
+            return r[function](*[r[i] for i in arguments], **{k: r[i] for k, i in keywords})
+        elif opcode == "load_var":
+            var, branches = args
+            if branches is None:
+                return var._resolve(choice)
+            idx = int(choice[var.id])
+            branch = branches[idx]
+            return var._values[idx] if branch is None else run_plan(*branch)
+        elif opcode == "binary_op":
+            func, left, right = args
+            return func(r[left], r[right])
+        elif opcode == "unary_op":
+            func, x = args
+            return func(r[x])
+        elif opcode == "getitem":
+            expression, item = args
+            return r[expression][r[item]]
+        elif opcode == "getattr":
+            expression, name = args
+            return getattr(r[expression], name)
+        elif opcode == "build":
+            cls, items = args
+            if cls is dict:
+                return {k: r[i] for k, i in items}
+            elif cls is list:
+                return [r[i] for i in items]
+            elif cls is tuple:
+                return tuple(r[i] for i in items)
+            elif issubclass(cls, dict):
+                return cls((k, r[i]) for k, i in items)
+            elif issubclass(cls, tuple) and hasattr(cls, "_fields"):
+                # namedtuple
+                return cls(*[r[i] for i in items])
+            else:
+                return cls(r[i] for i in items)
+        elif opcode == "cached":
+            expression, output, needs = args
+            key = expression._cache_key_of(choice)
+            value = _MISSING if key is None else expression._cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = run_plan(output, needs)
+                if key is not None:
+                    expression._cache.put(key, value)
+            return value
+        elif opcode == "evaluate":
+            (expression,) = args
+            expression = expression.clone(copy_on_write=True)
+            expression.freeze(choice)
+            return expression.evaluate()
+        else:
+            raise ValueError(f"unknown opcode '{opcode}'")
+
+    async def aevaluate(self, choice: dict = None):
+        """Evaluate the plan in an event loop.
+
+        Calls returning awaitables (e.g., of coroutine functions) are awaited and independent awaitables run concurrently. Other calls run in the event loop.
+
+        Args:
+            choice (dict, optional): the values of the variables where keys are variable ``id``. Defaults to ``None`` for an expression without variables.
+
+        Returns:
+            (any): the result of the evaluation.
+        """
+        # asyncio is only needed here, it is imported when needed to keep "import metalgpy" fast
+        import asyncio
+
+        schedule = _Schedule(self, {} if choice is None else choice)
+        running = {}
+
+        try:
+            while schedule.ready or running:
+                while schedule.ready:
+                    i = schedule.ready.popleft()
+                    call = schedule.step(i)
+                    if call is None:
+                        continue
+                    function, args, kwargs = call
+                    value = function(*args, **kwargs)
+                    if inspect.isawaitable(value):
+                        running[asyncio.ensure_future(value)] = i
+                    else:
+                        schedule.complete(i, value)
+
+                if running:
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        schedule.complete(running.pop(task), task.result())
+        finally:
+            for task in running:
+                task.cancel()
+
+        return schedule.r[self.output]
+
+    def _evaluate_concurrently(self, choice: dict, executor):
+        """Evaluate the plan by submitting function calls to ``executor`` as soon as their operands are computed."""
+        schedule = _Schedule(self, choice)
+        running = {}
+
+        try:
+            while schedule.ready or running:
+                while schedule.ready:
+                    i = schedule.ready.popleft()
+                    call = schedule.step(i)
+                    if call is not None:
+                        function, args, kwargs = call
+                        running[executor.submit(function, *args, **kwargs)] = i
+
+                if running:
+                    finished, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        schedule.complete(running.pop(future), future.result())
+        finally:
+            for future in running:
+                future.cancel()
+
+        return schedule.r[self.output]
+
+    __call__ = evaluate
+
+    def evaluate_batch(self, choices):
+        """Evaluate the plan on a batch of choices at once with NumPy.
+
+        Only plans made of variables, binary and unary operations can be evaluated in batch.
+
+        Args:
+            choices (dict or np.ndarray): the batch of choices, a dict where keys are variable ``id`` and values are 1-dim arrays or a structured array where fields are variable ``id``.
+
+        Raises:
+            ValueError: if the plan contains instructions which cannot be evaluated in batch.
+
+        Returns:
+            (np.ndarray): the results of the evaluation.
+        """
+        for opcode, _, args in self.instructions:
+            if opcode == "load_var" and args[1] is not None:
+                raise ValueError(
+                    f"variable {args[0].id} selects sub-expressions and cannot be evaluated in batch"
+                )
+            elif opcode not in ("load_var", "binary_op", "unary_op"):
+                raise ValueError(f"instruction '{opcode}' cannot be evaluated in batch")
+
+        r = self.registers.copy()
+
+        for opcode, target, args in self.instructions:
+            if opcode == "load_var":
+                r[target] = args[0]._resolve_batch(choices)
+            elif opcode == "binary_op":
+                func, left, right = args
+                r[target] = func(r[left], r[right])
+            else:
+                func, x = args
+                r[target] = func(r[x])
+
+        return np.asarray(r[self.output])
+
+
+def _needs(instructions: list, writer: dict, register: int) -> tuple:
+    """Return the indexes, in order, of the instructions computing ``register`` outside of the bodies of branches and memoized expressions."""
+    if register not in writer:
+        return ()
+    needs = {writer[register]}
+    stack = [writer[register]]
+    while stack:
+        opcode, _, args = instructions[stack.pop()]
+        for j in _operands(opcode, args):
+            i = writer.get(j)
+            if i is not None and i not in needs:
+                needs.add(i)
+                stack.append(i)
+    return tuple(sorted(needs))
+
+
+class _Schedule:
+    """The state of an evaluation of a plan where instructions are run as soon as their operands are computed, see ``CompiledExpression.aevaluate``.
+
+    Instructions are activated when they are needed, i.e., from the output of the plan and from the selected branches and the memoized expressions missing the cache. Function calls are returned by ``step`` to be run by the caller which reports their results with ``complete``.
+    """
+
+    def __init__(self, plan, choice: dict):
+        self.plan = plan
+        self.choice = choice
+        self.r = plan.registers.copy()
+        self.ready = collections.deque()
+        if plan._operand_instructions is None:
+            plan._operand_instructions = [
+                [plan._writer[j] for j in _operands(opcode, args) if j in plan._writer]
+                for opcode, _, args in plan.instructions
+            ]
+        self._operands = plan._operand_instructions
+        # activated instruction -> number of instructions it waits for
+        self._waiting = {}
+        self._dependents = collections.defaultdict(list)
+        self._done = set()
+        # instruction waiting for the body of a branch or memoized expression -> function returning its result
+        self._resume = {}
+
+        if plan.output in plan._writer:
+            self._activate(plan._writer[plan.output])
+
+    def _activate(self, i):
+        stack = [i]
+        while stack:
+            i = stack.pop()
+            if i in self._waiting or i in self._done:
+                continue
+            operands = [j for j in self._operands[i] if j not in self._done]
+            self._waiting[i] = len(operands)
+            for j in operands:
+                self._dependents[j].append(i)
+                stack.append(j)
+            if not operands:
+                self.ready.append(i)
+
+    def _wait_for(self, i, register, resume) -> bool:
+        """Make instruction ``i`` wait for the instruction writing ``register``, return ``False`` if it is already computed."""
+        j = self.plan._writer.get(register)
+        if j is None or j in self._done:
+            return False
+        self._waiting[i] = 1
+        self._dependents[j].append(i)
+        self._resume[i] = resume
+        self._activate(j)
+        return True
+
+    def complete(self, i, value):
+        """Store the result of instruction ``i`` and mark the instructions waiting for it as ready."""
+        self.r[self.plan.instructions[i].target] = value
+        self._done.add(i)
+        del self._waiting[i]
+        for j in self._dependents.pop(i, ()):
+            self._waiting[j] -= 1
+            if self._waiting[j] == 0:
+                self.ready.append(j)
+
+    def step(self, i):
+        """Run the ready instruction ``i``.
+
+        Returns:
+            (tuple): ``(function, args, kwargs)`` of the call to run for function calls, else ``None`` when the instruction is complete or waits for the body of a branch or a memoized expression.
+        """
+        r, choice = self.r, self.choice
+        if i in self._resume:
+            self.complete(i, self._resume.pop(i)())
+            return None
+
+        opcode, _, args = self.plan.instructions[i]
+        if opcode == "call_function":
+            function_parent, function, arguments, keywords = args
+            return (
+                _call_function,
+                (r[function_parent], r[function], [r[j] for j in arguments], {k: r[j] for k, j in keywords}),
+                {},
+            )
+        elif opcode == "call":
+            function, arguments, keywords = args
+            return r[function], [r[j] for j in arguments], {k: r[j] for k, j in keywords}
+        elif opcode == "load_var" and args[1] is not None:
+            var, branches = args
+            idx = int(choice[var.id])
+            branch = branches[idx]
+            if branch is None:
+                self.complete(i, var._values[idx])
+            else:
+                output = branch[0]
+                if not self._wait_for(i, output, lambda: r[output]):
+                    self.complete(i, r[output])
+        elif opcode == "cached":
+            expression, output, _ = args
+            key = expression._cache_key_of(choice)
+            value = _MISSING if key is None else expression._cache.get(key, _MISSING)
+            if value is not _MISSING:
+                self.complete(i, value)
+                return None
+
+            def store():
+                if key is not None:
+                    expression._cache.put(key, r[output])
+                return r[output]
+
+            if not self._wait_for(i, output, store):
+                self.complete(i, store())
+        else:
+            self.complete(i, self.plan._execute(opcode, args, r, choice, None))
+        return None
+
+
+def _changed(previous, value) -> bool:
+    """Check if the value of a variable changed, conservatively for values which cannot be compared (e.g., arrays)."""
+    if previous is value:
+        return False
+    try:
+        return bool(previous != value)
+    except ValueError:
+        return True
+
+
+class EvaluationSession:
+    """Evaluate an ``Expression``-tree for successive choices by re-evaluating only the nodes depending on variables whose values changed since the previous evaluation (e.g., in local search where consecutive choices differ by a few variables).
+
+    Intermediate results of the previous evaluation are reused as they are, nodes should not modify their inputs in place.
+
+    Args:
+        expression (Expression): the expression to evaluate.
+
+    Attributes:
+        plan (CompiledExpression): the compiled expression.
+        dependencies (list): the ``id`` of the variables each instruction of the plan depends on, transitively.
+        updates (int): the number of instructions evaluated by the last call to ``evaluate``.
+    """
+
+    def __init__(self, expression):
+        self.plan = expression.compile()
+        self.dependencies = self._dependencies(self.plan)
+        self.updates = 0
+        self._registers = None
+        self._choice = None
+        # instructions whose result is in the registers
+        self._computed = set()
+
+    @staticmethod
+    def _dependencies(plan) -> list:
+        dependencies = []
+        for opcode, _, args in plan.instructions:
+            if opcode in ("load_var", "cached", "evaluate"):
+                # the variables nested in a List are needed by its branches
+                variables = set(args[0].variables())
+            else:
+                variables = set()
+                for j in _operands(opcode, args):
+                    if j in plan._writer:
+                        variables |= dependencies[plan._writer[j]]
+            dependencies.append(frozenset(variables))
+        return dependencies
+
+    def evaluate(self, choice: dict):
+        """Evaluate the expression for ``choice``.
 
+        Args:
+            choice (dict): the values of the variables where keys are variable ``id``.
 
+        Returns:
+            (any): the result of the evaluation.
+        """
+        plan = self.plan
+        if self._registers is None:
+            changed = None
+            r = plan.registers.copy()
+            computed = set()
+        else:
+            changed = {
+                k
+                for k in self._choice.keys() | choice.keys()
+                if _changed(self._choice.get(k, _MISSING), choice.get(k, _MISSING))
+            }
+            r = self._registers
+            computed = {i for i in self._computed if changed.isdisjoint(self.dependencies[i])}
+
+        # intermediate results are inconsistent until the evaluation succeeds
+        self._registers = None
+        executed = set()
+
+        def run_plan(output, needs):
+            for i in needs:
+                if i not in computed and i not in executed:
+                    executed.add(i)
+                    opcode, target, args = plan.instructions[i]
+                    r[target] = plan._execute(opcode, args, r, choice, run_plan)
+            return r[output]
+
+        value = run_plan(plan.output, plan.order)
+
+        self._registers = r
+        self._choice = dict(choice)
+        self._computed = computed | executed
+        self.updates = len(executed)
+        return value
+
+    def reset(self):
+        """Drop the intermediate results so that the next evaluation evaluates all the nodes."""
+        self._registers = None
+        self._choice = None
+
+
+class _Compiler:
+    """Lower an ``Expression``-tree into a ``CompiledExpression``."""
+
+    def __init__(self):
+        self.instructions = []
+        self.registers = []
+        # expression lowered into each instruction
+        self.sources = []
+        # id of already lowered expressions -> register
+        self._memo = {}
+        # register -> index of the instruction writing it
+        self._writer = {}
+        # memoized expression lowered without its cache
+        self._uncached = None
+        # expression being lowered
+        self._source = None
+
+    def build(self, obj):
+        output = self.lower_tree(obj)
+        return CompiledExpression(
+            self.instructions,
+            self.registers,
+            output,
+            expression=obj if isinstance(obj, Expression) else None,
+            sources=self.sources,
+        )
+
+    def lower_tree(self, obj):
+        """Emit the instructions evaluating ``obj`` and its sub-expressions and return the register of its result."""
+        if isinstance(obj, Expression):
+            # sub-expressions are lowered first so that lower does not recurse
+            for node in _walk(obj, self._children, post_order=True):
+                self.lower(node)
+        return self.lower(obj)
+
+    def lower_branch(self, obj):
+        """Emit the instructions evaluating ``obj`` only when it is needed (e.g., the selected value of a ``List``).
+
+        Returns:
+            (tuple): the register of the result and the indexes of the instructions to execute to compute it.
+        """
+        output = self.lower_tree(obj)
+        return output, self.needs(output)
+
+    def needs(self, register):
+        """Return the indexes of the instructions to execute to compute ``register``."""
+        return _needs(self.instructions, self._writer, register)
+
+    def _children(self, node):
+        """Return the sub-expressions lowered in the current plan before ``node``."""
+        if (
+            isinstance(node, VarExpression)
+            or (node._cache is not None and node is not self._uncached)
+            or type(node)._compile is Expression._compile
+        ):
+            return []
+        return node._children()
+
+    def constant(self, value):
+        self.registers.append(value)
+        return len(self.registers) - 1
+
+    def emit(self, opcode, *args):
+        target = self.constant(None)
+        self._writer[target] = len(self.instructions)
+        self.instructions.append(Instruction(opcode, target, args))
+        self.sources.append(self._source)
+        return target
+
+    def lower(self, obj):
+        """Emit the instructions evaluating ``obj`` and return the register of its result."""
+        if isinstance(obj, Expression):
+            key = id(obj)
+            if key not in self._memo:
+                source, self._source = self._source, obj
+                if obj._cache is not None and obj is not self._uncached:
+                    self._memo[key] = self._lower_cached(obj)
+                else:
+                    self._memo[key] = obj._compile(self)
+                self._source = source
+            return self._memo[key]
+        elif not _contains_expression(obj):
+            return self.constant(obj)
+        elif isinstance(obj, dict):
+            items = tuple((k, self.lower(v)) for k, v in obj.items())
+        else:
+            items = tuple(self.lower(o) for o in obj)
+        return self.emit("build", type(obj), items)
+
+    def _lower_cached(self, obj):
+        # the memoized expression is a range of instructions skipped on cache hits
+        uncached, self._uncached = self._uncached, obj
+        for node in _walk(obj, self._children, post_order=True):
+            if node is not obj:
+                self.lower(node)
+        output = obj._compile(self)
+        self._uncached = uncached
+        return self.emit("cached", obj, output, self.needs(output))
+
+    def lower_arguments(self, args, kwargs):
+        arguments = tuple(self.lower(a) for a in args)
+        keywords = tuple((k, self.lower(v)) for k, v in kwargs.items())
+        return arguments, keywords
@@ -0,0 +1,104 @@
+import collections
+import sys
+import threading
+
+from ._cache import _sizeof
+
+# callables hook(stack, fingerprint, elapsed, result) called after each
+# function call evaluated by Expression.evaluate, see Profiler
+_EVALUATION_HOOKS = []
+
+
+class Profiler:
+    """Record the wall time, number of calls and result size of the function calls evaluated by ``Expression.evaluate``.
+
+    Calls are aggregated by the fingerprint of their ``Expression`` so that the calls of clones of a program (e.g., across trials) are aggregated together. Only sequential evaluations are recorded (i.e., without ``executor``) and evaluation hooks are not checked when no profiler is active.
+
+    .. code-block:: python
+
+        with mpy.Profiler() as profiler:
+            program.evaluate(choice)
+
+        profiler.print_stats()
+
+    Args:
+        sizeof (callable, optional): a function returning the size in bytes of a result. Defaults to ``None`` for ``nbytes`` of arrays and ``sys.getsizeof`` for other objects.
+    """
+
+    def __init__(self, sizeof=None):
+        self.sizeof = _sizeof if sizeof is None else sizeof
+        # fingerprint -> [name, calls, time, nbytes]
+        self._stats = {}
+        # stack of call names -> time
+        self._stacks = collections.Counter()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _EVALUATION_HOOKS.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _EVALUATION_HOOKS.remove(self)
+
+    def __call__(self, stack: tuple, fingerprint: str, elapsed: float, result):
+        nbytes = self.sizeof(result)
+        with self._lock:
+            stats = self._stats.setdefault(fingerprint, [stack[-1], 0, 0.0, 0])
+            stats[1] += 1
+            stats[2] += elapsed
+            stats[3] += nbytes
+            self._stacks[stack] += elapsed
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+            self._stacks.clear()
+
+    def stats(self) -> list:
+        """Return the flat profile, one row per call ``Expression`` sorted by decreasing total time.
+
+        Returns:
+            (list): a list of dict with keys ``name``, ``fingerprint``, ``calls``, ``time`` (total in seconds), ``time_per_call`` and ``nbytes`` (average size of the results), e.g., to build a ``pandas.DataFrame``.
+        """
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "fingerprint": fingerprint,
+                    "calls": calls,
+                    "time": time,
+                    "time_per_call": time / calls,
+                    "nbytes": nbytes // calls,
+                }
+                for fingerprint, (name, calls, time, nbytes) in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["time"], reverse=True)
+
+    def print_stats(self, file=None):
+        """Print the flat profile as a table."""
+        file = sys.stdout if file is None else file
+        print(
+            f"{'calls':>8} {'time':>10} {'per call':>10} {'nbytes':>10}  name (fingerprint)",
+            file=file,
+        )
+        for row in self.stats():
+            print(
+                f"{row['calls']:>8} {row['time']:>10.6f} {row['time_per_call']:>10.6f} "
+                f"{row['nbytes']:>10}  {row['name']} ({row['fingerprint'][:8]})",
+                file=file,
+            )
+
+    def collapsed(self) -> str:
+        """Return the profile in the collapsed stack format of flame graphs (e.g., ``flamegraph.pl`` or speedscope).
+
+        Each line is the stack of enclosing calls in the ``Expression``-tree, separated by ``;``, followed by the time spent in the last call in microseconds.
+
+        Returns:
+            (str): the collapsed stacks.
+        """
+        with self._lock:
+            lines = [
+                f"{';'.join(stack)} {round(elapsed * 1e6)}"
+                for stack, elapsed in sorted(self._stacks.items())
+            ]
+        return "\n".join(lines)
@@ -1,6 +1,5 @@
 from ._expression import Expression
 from .sampler import BaseSampler, RandomSampler
-from .optimizer import Optimizer, BayesianOptimizer
 
 
 class Evaluation:
@@ -44,6 +43,9 @@ def sample(sampler, optimizer=None, size=None, rng=None):
 
     # check the value passed for optimizer
     if optimizer is None:
+        # the optimizer pulls scikit-optimize and scikit-learn, it is imported when needed
+        from .optimizer import BayesianOptimizer
+
         optimizer = BayesianOptimizer(sampler, random_state=rng)
 
     variables = list(sampler.expression.variables().keys())
@@ -0,0 +1,152 @@
+"""Binary encoding of ``Expression``-trees, see ``Expression.to_bytes`` and ``Expression.from_bytes``.
+
+The encoding is made of a header (magic bytes and format version) followed by two pickles:
+
+1. the table of the classes of the nodes, the table of the attribute names of the nodes and the index of the class of each node of the tree in post-order,
+2. the index of the attribute names and the attribute values of each node.
+
+Sub-expressions in attribute values are references to the index of their node so that shared sub-expressions are encoded once, and importable functions and classes are references to their import path.
+"""
+import importlib
+import io
+import pickle
+
+from ._expression import Expression, ObjectExpression, _getstate, _setstate, _walk
+
+MAGIC = b"MPY"
+VERSION = 1
+
+# memoization state, bound to the current process
+_CACHE_ATTRS = ("_cache", "_cache_key", "_cache_token", "_cache_variables")
+
+
+def _resolve(module: str, qualname: str):
+    """Return the object at ``module:qualname``, functions and classes transformed with ``meta`` are unwrapped."""
+    obj = importlib.import_module(module)
+    for name in qualname.split("."):
+        if isinstance(obj, ObjectExpression):
+            obj = obj._obj
+        obj = getattr(obj, name)
+    if isinstance(obj, ObjectExpression):
+        obj = obj._obj
+    return obj
+
+
+def _path(obj):
+    """Return the import path ``(module, qualname)`` of ``obj`` or ``None`` if it cannot be imported back."""
+    module = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", None)
+    if not isinstance(module, str) or not isinstance(qualname, str) or "<" in qualname:
+        return None
+    try:
+        if _resolve(module, qualname) is obj:
+            return module, qualname
+    except (ImportError, AttributeError):
+        pass
+    return None
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, nodes: dict):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # id of the expressions of the tree -> index
+        self._nodes = nodes
+        # id of the objects already checked -> import path or None
+        self._paths = {}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Expression):
+            return ("node", self._nodes[id(obj)])
+        if callable(obj):
+            key = id(obj)
+            if key not in self._paths:
+                self._paths[key] = _path(obj)
+            if self._paths[key] is not None:
+                return ("path",) + self._paths[key]
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, nodes: list):
+        super().__init__(file)
+        self._nodes = nodes
+
+    def persistent_load(self, pid):
+        if pid[0] == "node":
+            return self._nodes[pid[1]]
+        elif pid[0] == "path":
+            return _resolve(pid[1], pid[2])
+        raise pickle.UnpicklingError(f"unknown persistent id {pid!r}")
+
+
+def _class_ref(cls):
+    """Return the reference of the class of a node, classes created by ``meta`` are referenced by their name."""
+    if issubclass(cls, ObjectExpression) and cls.__name__.startswith("ObjectExpression_"):
+        return ("meta", cls.__name__[len("ObjectExpression_"):])
+    return cls
+
+
+def _class_from_ref(ref):
+    if isinstance(ref, tuple):
+        from ._decorator import _meta_class
+
+        return _meta_class(ref[1])
+    return ref
+
+
+def dumps(expression) -> bytes:
+    nodes = list(_walk(expression, lambda node: node._children(), post_order=True))
+    index = {id(node): i for i, node in enumerate(nodes)}
+
+    classes, class_index = [], {}
+    layouts, layout_index = [], {}
+    node_classes, records = [], []
+    for node in nodes:
+        cls = type(node)
+        if cls not in class_index:
+            class_index[cls] = len(classes)
+            classes.append(_class_ref(cls))
+        node_classes.append(class_index[cls])
+
+        state = _getstate(node)
+        for name in _CACHE_ATTRS:
+            state.pop(name, None)
+        if "_call_cache" in state:
+            state["_call_cache"] = None
+
+        layout = tuple(state)
+        if layout not in layout_index:
+            layout_index[layout] = len(layouts)
+            layouts.append(layout)
+        records.append((layout_index[layout], *state.values()))
+
+    file = io.BytesIO()
+    file.write(MAGIC + bytes([VERSION]))
+    pickler = _Pickler(file, index)
+    pickler.dump((classes, layouts, node_classes))
+    pickler.dump(records)
+    return file.getvalue()
+
+
+def loads(data: bytes):
+    header = MAGIC + bytes([VERSION])
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("data is not an encoded Expression")
+    if data[: len(header)] != header:
+        raise ValueError(
+            f"unsupported encoding version {data[len(MAGIC)]}, the supported version is {VERSION}"
+        )
+
+    file = io.BytesIO(data)
+    file.seek(len(header))
+    nodes = []
+    unpickler = _Unpickler(file, nodes)
+    classes, layouts, node_classes = unpickler.load()
+    classes = [_class_from_ref(ref) for ref in classes]
+    for i in node_classes:
+        nodes.append(classes[i].__new__(classes[i]))
+
+    records = unpickler.load()
+    for node, (layout, *values) in zip(nodes, records):
+        _setstate(node, dict(zip(layouts[layout], values)))
+    return nodes[-1]
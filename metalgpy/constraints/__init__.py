@@ -0,0 +1,4 @@
+from ._constraint import Constraint, check
+from ._rejection_sampler import RejectionSampler
+
+__all__ = ["Constraint", "check", "RejectionSampler"]
@@ -0,0 +1,96 @@
+import numpy as np
+
+from .._expression import Expression
+
+
+class Constraint:
+    """A constraint on the variables of an expression, written with the operators of expressions and checked on whole batches of samples at once.
+
+    .. code-block:: python
+
+        units_1, units_2 = mpy.Int(8, 64, name="units_1"), mpy.Int(8, 64, name="units_2")
+        constraint = Constraint(units_1 >= units_2)
+        feasible = constraint(sampler.sample_columns(1000))
+
+    Samples where a variable of the constraint is inactive (i.e., ``NaN`` as drawn by ``ConditionalSampler``) satisfy the constraint.
+
+    Args:
+        expression (Expression): a boolean expression made of variables, binary and unary operations (e.g., ``lr * batch_size < 1``), see ``Expression.evaluate_batch``.
+        name (str, optional): the name of the constraint. Defaults to ``None`` for the representation of the expression.
+
+    Raises:
+        ValueError: if the expression is not an ``Expression`` (e.g., ``==`` between a variable and a value compares variables, use ``!=`` instead) or cannot be evaluated in batch.
+    """
+
+    def __init__(self, expression: Expression, name: str = None):
+        if not isinstance(expression, Expression):
+            raise ValueError(f"a constraint should be an Expression but is {expression!r} with type '{type(expression)}'")
+        self.expression = expression
+        self.name = repr(expression) if name is None else name
+        self.variables = list(expression.variables())
+
+        # checks that the expression can be evaluated in batch once
+        self._plan = expression.compile()
+        self._plan.evaluate_batch({var_id: np.empty(0) for var_id in self.variables})
+
+    def __repr__(self) -> str:
+        return f"Constraint({self.name})"
+
+    def __call__(self, samples) -> np.ndarray:
+        """Check the constraint on a batch of samples.
+
+        Args:
+            samples (dict or np.ndarray): a dict where keys are variable ``id`` and values are 1-dim arrays or a structured array where fields are variable ``id``, e.g., as returned by ``sample_columns``.
+
+        Returns:
+            (np.ndarray): a boolean array, ``True`` for the samples satisfying the constraint.
+        """
+        columns = {var_id: np.asarray(samples[var_id]) for var_id in self.variables}
+        size = len(next(iter(columns.values()))) if columns else 1
+
+        # inactive variables are not constrained
+        active = np.ones(size, dtype=bool)
+        for column in columns.values():
+            if column.dtype.kind == "f":
+                active &= ~np.isnan(column)
+
+        satisfied = np.ones(size, dtype=bool)
+        if active.all():
+            satisfied[:] = self._plan.evaluate_batch(columns)
+        elif active.any():
+            satisfied[active] = self._plan.evaluate_batch(
+                {var_id: column[active] for var_id, column in columns.items()}
+            )
+        return satisfied
+
+    def is_satisfied(self, choice: dict) -> bool:
+        """Check the constraint on a single sample.
+
+        Args:
+            choice (dict): a dict where keys are variable ``id`` and values are the chosen values, as returned by ``sample(flat=False)``.
+
+        Returns:
+            (bool): ``True`` if the sample satisfies the constraint.
+        """
+        if any(var_id not in choice for var_id in self.variables):
+            return True
+        return bool(self({var_id: [choice[var_id]] for var_id in self.variables})[0])
+
+
+def check(constraints: list, samples) -> np.ndarray:
+    """Check a list of constraints on a batch of samples.
+
+    Args:
+        constraints (list): a list of ``Constraint`` or of boolean expressions.
+        samples (dict or np.ndarray): the batch of samples, see ``Constraint.__call__``.
+
+    Returns:
+        (np.ndarray): a boolean array, ``True`` for the samples satisfying all the constraints.
+    """
+    size = len(samples) if isinstance(samples, np.ndarray) else len(next(iter(samples.values())))
+    satisfied = np.ones(size, dtype=bool)
+    for constraint in constraints:
+        if not isinstance(constraint, Constraint):
+            constraint = Constraint(constraint)
+        satisfied &= constraint(samples)
+    return satisfied
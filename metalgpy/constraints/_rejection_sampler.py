@@ -0,0 +1,148 @@
+import numpy as np
+
+from ..sampler import BaseSampler
+from ..sampler._utils import to_flat, to_structured
+from ._constraint import Constraint, check
+
+
+class RejectionSampler(BaseSampler):
+    """Defines a sampler emitting only samples which satisfy constraints. Batches of samples are drawn from another sampler, infeasible samples are optionally repaired and the remaining ones are rejected.
+
+    .. code-block:: python
+
+        sampler = RejectionSampler(RandomSampler(program), [units_1 >= units_2, lr * batch_size < 1])
+        columns = sampler.sample_columns(1000)
+        print(sampler.acceptance_rate)
+
+    Args:
+        sampler (RandomSampler): the sampler drawing the candidates, it must implement ``sample_columns`` (e.g., ``RandomSampler`` or ``SobolSampler``).
+        constraints (list): a list of ``Constraint`` or of boolean expressions.
+        repair (callable, optional): a function ``repair(columns)`` receiving the columns of the infeasible candidates and returning repaired columns for the same candidates, which are checked again. Defaults to ``None``.
+        max_draws (int, optional): the maximum number of candidates drawn for a single request. Defaults to ``1_000_000``.
+
+    Returns:
+        RejectionSampler: a sampler object.
+    """
+
+    def __init__(self, sampler, constraints: list, repair=None, max_draws: int = 1_000_000):
+        self.sampler = sampler
+        self.expression = sampler.expression
+        self.variables = sampler.variables
+        self.distributions = sampler.distributions
+        self.constraints = [c if isinstance(c, Constraint) else Constraint(c) for c in constraints]
+        self.repair = repair
+        self.max_draws = max_draws
+        self.reset_metrics()
+
+    @property
+    def rng(self):
+        return self.sampler.rng
+
+    def set_random_state(self, rng):
+        self.sampler.set_random_state(rng)
+
+    def spawn(self, n: int) -> list:
+        return [
+            RejectionSampler(child, self.constraints, self.repair, self.max_draws)
+            for child in self.sampler.spawn(n)
+        ]
+
+    def reset_metrics(self):
+        """Reset the counters of drawn, repaired, feasible (i.e., satisfying the constraints) and accepted (i.e., returned) candidates."""
+        self.n_drawn = 0
+        self.n_repaired = 0
+        self.n_feasible = 0
+        self.n_accepted = 0
+        # constraint name -> number of drawn candidates violating it
+        self.violations = {constraint.name: 0 for constraint in self.constraints}
+
+    @property
+    def acceptance_rate(self) -> float:
+        """The fraction of the drawn candidates satisfying the constraints, repaired ones included."""
+        return self.n_feasible / self.n_drawn if self.n_drawn else float("nan")
+
+    def metrics(self) -> dict:
+        """Return the acceptance metrics of the sampler.
+
+        Returns:
+            (dict): a dict with keys ``drawn``, ``repaired``, ``feasible``, ``accepted`` (feasible candidates returned, the surplus of the last batch of a request is dropped), ``acceptance_rate`` and ``violations`` (number of drawn candidates violating each constraint, by name).
+        """
+        return {
+            "drawn": self.n_drawn,
+            "repaired": self.n_repaired,
+            "feasible": self.n_feasible,
+            "accepted": self.n_accepted,
+            "acceptance_rate": self.acceptance_rate,
+            "violations": dict(self.violations),
+        }
+
+    def sample(self, size=None, flat=True):
+        """Sample configurations of parameters satisfying the constraints, see ``RandomSampler.sample``."""
+        if isinstance(size, int) and size > 0:
+            columns = self._sample_columns(size)
+            if flat:
+                return to_flat(columns, size)
+            return self.sampler._to_dicts(columns)
+
+        if size is None:
+            columns = self._sample_columns(1)
+            if flat:
+                return to_flat(columns, 1)[0]
+            return self.sampler._to_dicts(columns)[0]
+
+        raise ValueError("The value %r cannot be specified as size, size expects 'None' or a positive integer")
+
+    def sample_columns(self, size: int, structured: bool = False):
+        """Sample configurations of parameters satisfying the constraints as typed columns, see ``RandomSampler.sample_columns``."""
+        columns = self._sample_columns(size)
+
+        if structured:
+            return to_structured(columns, size)
+
+        return columns
+
+    def _sample_columns(self, size):
+        if size == 0:
+            return self.sampler.sample_columns(0)
+
+        chunks, n_accepted, n_drawn = [], 0, 0
+
+        while n_accepted < size:
+            if n_drawn >= self.max_draws:
+                raise RuntimeError(
+                    f"only {n_accepted} of {size} samples satisfy the constraints after drawing {n_drawn} candidates"
+                )
+
+            # draw enough candidates for the remaining samples at the current acceptance rate
+            rate = self.acceptance_rate if self.n_drawn else 1.0
+            batch_size = min(int(np.ceil((size - n_accepted) / max(rate, 0.01) * 1.1)), self.max_draws - n_drawn)
+            columns = self.sampler.sample_columns(batch_size)
+            n_drawn += batch_size
+            self.n_drawn += batch_size
+
+            satisfied = np.ones(batch_size, dtype=bool)
+            for constraint in self.constraints:
+                mask = constraint(columns)
+                self.violations[constraint.name] += int(np.count_nonzero(~mask))
+                satisfied &= mask
+
+            if self.repair is not None and not satisfied.all():
+                infeasible = ~satisfied
+                repaired = self.repair({var_id: column[infeasible] for var_id, column in columns.items()})
+                repaired_satisfied = check(self.constraints, repaired)
+                for var_id, column in columns.items():
+                    column = column.copy()
+                    column[infeasible] = repaired[var_id]
+                    columns[var_id] = column
+                self.n_repaired += int(np.count_nonzero(repaired_satisfied))
+                satisfied[infeasible] = repaired_satisfied
+
+            feasible = int(np.count_nonzero(satisfied))
+            self.n_feasible += feasible
+            # the feasible candidates beyond the requested size are dropped
+            accepted = min(feasible, size - n_accepted)
+            chunks.append({var_id: column[satisfied][:accepted] for var_id, column in columns.items()})
+            n_accepted += accepted
+            self.n_accepted += accepted
+
+        return {var_id: np.concatenate([chunk[var_id] for chunk in chunks]) for var_id in columns}
@@ -1,4 +1,12 @@
 from ._base_optimizer import Optimizer
-from .skopt import BayesianOptimizer
 
 __all__ = ["Optimizer", "BayesianOptimizer"]
+
+
+def __getattr__(name):
+    # the vendored skopt pulls scikit-learn, it is imported on first access
+    if name == "BayesianOptimizer":
+        from .skopt import BayesianOptimizer
+
+        return BayesianOptimizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,14 @@
 from ._base_sampler import BaseSampler
 from ._random_sampler import RandomSampler
+from ._conditional_sampler import ConditionalSampler
+from ._qmc_sampler import QMCSampler, SobolSampler, HaltonSampler, LhsSampler
 
-__all__ = ["BaseSampler", "RandomSampler"]
+__all__ = [
+    "BaseSampler",
+    "RandomSampler",
+    "ConditionalSampler",
+    "QMCSampler",
+    "SobolSampler",
+    "HaltonSampler",
+    "LhsSampler",
+]
@@ -1,10 +1,11 @@
 import abc
 import collections
+import copy
 
 import numpy as np
 
 from .._expression import VarExpression
-from ._utils import check_random_state
+from ._utils import check_random_state, spawn_random_states
 
 class BaseSampler(abc.ABC):
 
@@ -20,6 +21,30 @@ class BaseSampler(abc.ABC):
     def set_random_state(self, rng):
         self.rng = check_random_state(rng)
 
+    def spawn(self, n: int) -> list:
+        """Create ``n`` copies of the sampler drawing from independent random streams, e.g., to sample in parallel across processes.
+
+        The random states of the children are derived from the random state of the sampler so that the ``i``-th child draws the same samples whatever ``n`` is when the sampler is seeded.
+
+        .. code-block:: python
+
+            samplers = mpy.sampler.RandomSampler(program, rng=np.random.SeedSequence(42)).spawn(8)
+            with ProcessPoolExecutor() as executor:
+                pools = list(executor.map(operator.methodcaller("sample", 100_000), samplers))
+
+        Args:
+            n (int): the number of samplers to create.
+
+        Returns:
+            (list): a list of ``n`` samplers.
+        """
+        children = []
+        for rng in spawn_random_states(self.rng, n):
+            child = copy.copy(self)
+            child.set_random_state(rng)
+            children.append(child)
+        return children
+
     @abc.abstractmethod
     def sample(self, size=None, flat=True):
         pass
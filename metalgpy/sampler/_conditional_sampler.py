@@ -0,0 +1,95 @@
+import numpy as np
+
+from .._expression import Int, List, VarExpression
+from ._random_sampler import RandomSampler
+
+
+class ConditionalSampler(RandomSampler):
+    """Defines a sampler following the hierarchy of choices of the expression.
+
+    A variable nested in a ``List`` is only active, and drawn, for the samples where the ``List`` selects a value containing it. Inactive variables are ``NaN`` in columns and flat samples, and are missing from ``dict`` samples.
+
+    Args:
+        expression (Expression): a metalgpy expression.
+        distributions (dict, optional): preferred distributions for drawing samples. Defaults to None.
+        rng (int, optional): a random seed to generate same stream of values.Defaults to None.
+
+    Returns:
+        ConditionalSampler: a sampler object.
+    """
+
+    def __init__(self, expression, distributions: dict = None, rng: np.random.RandomState = None):
+        super().__init__(expression, distributions, rng)
+
+        # variables activated by each value of the lists
+        self._child_choices = {
+            var_id: var_exp.child_choices()
+            for var_id, var_exp in self.variables.items()
+            if isinstance(var_exp, List)
+        }
+        self._order = self._topological_order()
+
+    def _topological_order(self):
+        # parent lists come before the variables they activate (reversed
+        # post-order of a depth-first search)
+        order, visited = [], set()
+        stack = [(var_id, False) for var_id in reversed(list(self.expression.choices()))]
+
+        while stack:
+            var_id, expanded = stack.pop()
+            if expanded:
+                order.append(var_id)
+                continue
+            if var_id in visited:
+                continue
+            visited.add(var_id)
+            stack.append((var_id, True))
+            for choices in self._child_choices.get(var_id, {}).values():
+                stack.extend((child_id, False) for child_id in choices if child_id not in visited)
+
+        return order[::-1]
+
+    def _sample_columns(self, size, rngs=None):
+        # variables of the expression are active for all the samples
+        active = {var_id: np.ones(size, dtype=bool) for var_id in self.expression.choices()}
+        columns = {var_id: np.full(size, np.nan) for var_id in self.variables}
+
+        for var_id in self._order:
+            mask = active.get(var_id)
+            if mask is None or not isinstance(self.variables[var_id], VarExpression):
+                continue
+
+            # only active variables are drawn
+            n_active = int(np.count_nonzero(mask))
+            if n_active == 0:
+                continue
+            values = self._draw(var_id, n_active, None if rngs is None else rngs[var_id])
+            columns[var_id][mask] = values
+
+            # the values of the list activate their variables
+            for index, choices in self._child_choices.get(var_id, {}).items():
+                selected = mask.copy()
+                selected[mask] = values == index
+                for child_id in choices:
+                    if child_id in active:
+                        active[child_id] |= selected
+                    else:
+                        active[child_id] = selected.copy()
+
+        return columns
+
+    def _to_dicts(self, columns):
+        # inactive variables are not part of the samples and discrete values are integers
+        discrete = {
+            var_id for var_id, var_exp in self.variables.items() if isinstance(var_exp, (Int, List))
+        }
+        samples = []
+        for row in zip(*columns.values()):
+            samples.append(
+                {
+                    var_id: int(value) if var_id in discrete else value
+                    for var_id, value in zip(columns.keys(), row)
+                    if not np.isnan(value)
+                }
+            )
+        return samples
@@ -0,0 +1,126 @@
+import abc
+import warnings
+
+import numpy as np
+
+from .._expression import Float, Int, List, VarExpression
+from ._random_sampler import RandomSampler
+from ._utils import check_random_state, seed_sequence
+
+
+class QMCSampler(RandomSampler):
+    """Defines a base class for quasi-Monte-Carlo samplers, drawing space-filling designs over the variables of an expression.
+
+    The points of a ``scipy.stats.qmc`` engine in the unit hypercube, one dimension per variable, are mapped onto the variables: uniformly onto the bounds of ``Int`` and ``Float`` and onto the indexes of ``List``, or with the inverse CDF (``ppf``) of preferred distributions. Successive calls continue the sequence of the engine.
+
+    Args:
+        expression (Expression): a metalgpy expression.
+        distributions (dict, optional): preferred distributions for drawing samples, they must have a ``ppf``. Defaults to None.
+        rng (int, optional): a random seed to generate same stream of values. Defaults to None.
+    """
+
+    def __init__(self, expression, distributions: dict = None, rng: np.random.RandomState = None):
+        super().__init__(expression, distributions, rng)
+        self._engine = self._create_engine(len(self._transforms), np.random.default_rng(seed_sequence(self.rng)))
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("_transforms", None)
+        return state
+
+    def _compile(self):
+        super()._compile()
+        self._transforms = {
+            var_id: self._compile_transform(var_id, var_exp)
+            for var_id, var_exp in self.variables.items()
+            if isinstance(var_exp, VarExpression)
+        }
+
+    @abc.abstractmethod
+    def _create_engine(self, d, rng):
+        """Return the ``scipy.stats.qmc.QMCEngine`` of dimension ``d`` seeded with ``rng``."""
+        pass
+
+    def set_random_state(self, rng):
+        # the sequence restarts from the new random state
+        self.rng = check_random_state(rng)
+        self._engine = self._create_engine(len(self._transforms), np.random.default_rng(seed_sequence(self.rng)))
+
+    def _compile_transform(self, var_id, var_exp):
+        # map points of [0, 1) onto the values of a variable
+        dist, params = self._dist_map[var_id]
+
+        if (dist, params) == var_exp._dist:
+            if isinstance(var_exp, (Int, List)):
+                low, high = params["low"], params["high"]
+                return lambda u: np.minimum(low + np.floor(u * (high - low)).astype(np.int64), high - 1)
+
+            if isinstance(var_exp, Float):
+                low, high = var_exp._low, var_exp._high
+                return lambda u: low + u * (high - low)
+
+        frozen_dist = dist(**params)
+        if not hasattr(frozen_dist, "ppf"):
+            raise ValueError(f"the distribution of variable {var_id!r} has no ppf to map quasi-random points")
+        if isinstance(var_exp, (Int, List)):
+            return lambda u: frozen_dist.ppf(u).astype(np.int64)
+        return frozen_dist.ppf
+
+    def _sample_columns(self, size, rngs=None):
+        # the points of the engine are shared by all the variables
+        points = self._engine.random(size)
+        return {
+            var_id: transform(points[:, i])
+            for i, (var_id, transform) in enumerate(self._transforms.items())
+        }
+
+
+class SobolSampler(QMCSampler):
+    """Defines a sampler of scrambled Sobol' sequences. The balance properties of the sequence hold for sizes which are powers of 2.
+
+    Args:
+        expression (Expression): a metalgpy expression.
+        distributions (dict, optional): preferred distributions for drawing samples, they must have a ``ppf``. Defaults to None.
+        rng (int, optional): a random seed to generate same stream of values. Defaults to None.
+    """
+
+    def _create_engine(self, d, rng):
+        from scipy.stats import qmc
+
+        return qmc.Sobol(d, scramble=True, seed=rng)
+
+    def _sample_columns(self, size, rngs=None):
+        with warnings.catch_warnings():
+            # samples are requested by batches of any size (e.g., one by one)
+            warnings.filterwarnings("ignore", message="The balance properties of Sobol", category=UserWarning)
+            return super()._sample_columns(size, rngs)
+
+
+class HaltonSampler(QMCSampler):
+    """Defines a sampler of scrambled Halton sequences.
+
+    Args:
+        expression (Expression): a metalgpy expression.
+        distributions (dict, optional): preferred distributions for drawing samples, they must have a ``ppf``. Defaults to None.
+        rng (int, optional): a random seed to generate same stream of values. Defaults to None.
+    """
+
+    def _create_engine(self, d, rng):
+        from scipy.stats import qmc
+
+        return qmc.Halton(d, scramble=True, seed=rng)
+
+
+class LhsSampler(QMCSampler):
+    """Defines a Latin hypercube sampler, each call draws a new design of the requested size where each variable is stratified in as many intervals as samples.
+
+    Args:
+        expression (Expression): a metalgpy expression.
+        distributions (dict, optional): preferred distributions for drawing samples, they must have a ``ppf``. Defaults to None.
+        rng (int, optional): a random seed to generate same stream of values. Defaults to None.
+    """
+
+    def _create_engine(self, d, rng):
+        from scipy.stats import qmc
+
+        return qmc.LatinHypercube(d, seed=rng)
@@ -2,8 +2,9 @@ import collections
 
 import numpy as np
 
-from .._expression import VarExpression
+from .._expression import Float, Int, List, VarExpression
 from ._base_sampler import BaseSampler
+from ._utils import spawn_random_states, to_flat, to_structured
 
 
 class RandomSampler(BaseSampler):
@@ -17,6 +18,31 @@ class RandomSampler(BaseSampler):
     Returns:
         RandomSampler: a sampler object.
     """
+
+    def __init__(self, expression, distributions: dict = None, rng: np.random.RandomState = None):
+        super().__init__(expression, distributions, rng)
+
+        # the distributions are mapped and compiled once, see _compile_draw
+        self._dist_map = self._map_dist(self.variables)
+        self._compile()
+
+    def __getstate__(self):
+        # compiled functions are not picklable, they are compiled again when unpickled
+        state = self.__dict__.copy()
+        state.pop("_draws", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def _compile(self):
+        self._draws = {
+            var_id: self._compile_draw(var_id, var_exp)
+            for var_id, var_exp in self.variables.items()
+            if isinstance(var_exp, VarExpression)
+        }
+
     def sample(self, size=None, flat=True):
         """Sample configurations of parameters from the variables available in the expression.
 
@@ -33,51 +59,128 @@ class RandomSampler(BaseSampler):
         # check for sample size
         if isinstance(size, int) and size > 0:
             # get the required number of samples
-            samples = self._sample(size)
+            columns = self._sample_columns(size)
 
             # check for flat flag
             if flat:
-                # obtain just the samples from the dict
-                samples = np.array([list(sample.values()) for sample in samples])
+                # stack the columns into a 2-dim array
+                return to_flat(columns, size)
 
-            # return the samples
-            return samples
+            # arrange the values by key
+            return self._to_dicts(columns)
 
         if size is None:
             # obtain a sample
-            sample = self._sample(size=1)[0]
+            columns = self._sample_columns(size=1)
 
             # check for flat flag to see if array/dict is expected
             if flat:
-                # obtain sample from the dict
-                sample = np.array(list(sample.values()))
+                # obtain the first row of the samples
+                return to_flat(columns, 1)[0]
 
             # return the sample
-            return sample
+            return self._to_dicts(columns)[0]
 
         # raise value error
         raise ValueError("The value %r cannot be specified as size, size expects 'None' or a positive integer")
 
-    def _sample(self, size):        
-        # init a dict to store samples
-        self._cache = {}
+    def sample_columns(self, size: int, structured: bool = False):
+        """Sample configurations of parameters as typed columns, without building a ``dict`` per sample.
 
-        # iterate over the possible choices of the expression
-        self._dist_map = self._map_dist(self.variables)
+        Args:
+            size (int): The number of samples to draw from the search space.
+            structured (bool, optional): If ``True`` then the samples are a structured array with a field per variable. If ``False`` the samples are a ``dict`` of columns. Defaults to ``False``.
+
+        Returns:
+            (dict|array): a dict where keys are variable names and values are 1-dim arrays (e.g., integers for ``Int`` and the index of ``List``, floats for ``Float``) or a structured array with the same fields.
+        """
+        columns = self._sample_columns(size)
+
+        if structured:
+            return to_structured(columns, size)
+
+        return columns
+
+    def iter_samples(self, chunk_size: int, size: int = None, structured: bool = False):
+        """Iterate over configurations of parameters by chunks of typed columns, the memory used does not depend on the total number of samples.
+
+        Each variable is drawn from its own random stream, derived from the random state of the sampler when the iteration starts, so that the concatenated chunks do not depend on ``chunk_size`` (e.g., they are equal to the single chunk of ``chunk_size=size``).
+
+        .. code-block:: python
+
+            for columns in sampler.iter_samples(chunk_size=10_000, size=1_000_000):
+                scores = acquisition(columns)
+
+        Args:
+            chunk_size (int): The number of samples of each chunk, the last chunk is smaller when ``size`` is not a multiple of ``chunk_size``.
+            size (int, optional): The total number of samples. Defaults to ``None`` to iterate indefinitely.
+            structured (bool, optional): If ``True`` then each chunk is a structured array, else a ``dict`` of columns, see ``sample_columns``. Defaults to ``False``.
+
+        Raises:
+            ValueError: if ``chunk_size`` or ``size`` has a wrong value.
+
+        Yields:
+            (dict|array): the chunks of samples.
+        """
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError(f"The value {chunk_size!r} cannot be specified as chunk_size, chunk_size expects a positive integer")
+        if size is not None and (not isinstance(size, int) or size < 0):
+            raise ValueError(f"The value {size!r} cannot be specified as size, size expects 'None' or a non-negative integer")
+
+        # an independent random stream per variable
+        rngs = dict(zip(self.variables, spawn_random_states(self.rng, len(self.variables))))
+
+        remaining = size
+        while remaining is None or remaining > 0:
+            chunk = chunk_size if remaining is None else min(chunk_size, remaining)
+            columns = self._sample_columns(chunk, rngs)
+            yield to_structured(columns, chunk) if structured else columns
+
+            if remaining is not None:
+                remaining -= chunk
+
+    def _sample_columns(self, size, rngs=None):
+        # init a dict to store samples
+        columns = {}
 
         # iterate over the possible choices of the expression
         for var_id, var_exp in self.variables.items():
             # check if the expression is Float
             if isinstance(var_exp, VarExpression):
-                dist, params = self._dist_map[var_id]
-                self._cache[var_id] = dist.rvs(**params, size=size, random_state=self.rng)
-
-        # arrange the values by key
-        self._cache = [{var_id: self._cache[var_id][i] \
-                        for var_id in self._cache.keys()} for i in range(size)]
+                columns[var_id] = self._draw(var_id, size, None if rngs is None else rngs[var_id])
 
         # return the samples
-        return self._cache
+        return columns
+
+    def _draw(self, var_id, size, rng=None):
+        # draw the values of a variable from its distribution
+        return self._draws[var_id](self.rng if rng is None else rng, size)
+
+    def _compile_draw(self, var_id, var_exp):
+        """Return a function ``draw(rng, size)`` of the values of a variable. The default distributions of ``Int``, ``List`` and ``Float`` are drawn directly with the random state, other distributions are frozen once and drawn with ``rvs``."""
+        dist, params = self._dist_map[var_id]
+
+        if (dist, params) == var_exp._dist:
+            if isinstance(var_exp, (Int, List)):
+                low, high = params["low"], params["high"]
+
+                def draw(rng, size):
+                    if isinstance(rng, np.random.Generator):
+                        return rng.integers(low, high, size=size)
+                    return rng.randint(low, high, size=size)
+
+                return draw
+
+            if isinstance(var_exp, Float):
+                low, high = var_exp._low, var_exp._high
+                return lambda rng, size: rng.uniform(low, high, size=size)
+
+        frozen_dist = dist(**params)
+        return lambda rng, size: np.asarray(frozen_dist.rvs(size=size, random_state=rng))
+
+    def _to_dicts(self, columns):
+        # arrange the values of the columns by sample
+        return [dict(zip(columns.keys(), row)) for row in zip(*columns.values())]
 
     def _map_dist(self, variables):
         # map the default dist map
@@ -7,15 +7,83 @@ def check_random_state(rng):
     Courtesy : https://scikit-learn.org/stable/modules/generated/sklearn.utils.check_random_state.html
 
     Args:
-        rng (int ? np.random.RandomState): a random state instance or an integer seed.
+        rng (int ? np.random.RandomState ? np.random.Generator ? np.random.SeedSequence): a random state instance, a generator, a seed sequence (for a generator) or an integer seed.
 
     Returns:
-        Random State Object (np.random.RandomState)
+        Random State Object (np.random.RandomState or np.random.Generator)
     """
     if rng is None:
         return np.random.mtrand._rand
-    if isinstance(rng, int):
+    if isinstance(rng, (int, np.integer)):
         return np.random.RandomState(rng)
-    if isinstance(rng, np.random.RandomState):
+    if isinstance(rng, np.random.SeedSequence):
+        return np.random.default_rng(rng)
+    if isinstance(rng, (np.random.RandomState, np.random.Generator)):
         return rng
     raise ValueError("The value %r cannot be used for creating a random state instance")
+
+
+def seed_sequence(rng) -> np.random.SeedSequence:
+    """Create a ``np.random.SeedSequence`` whose entropy is drawn from ``rng``.
+
+    Args:
+        rng (np.random.RandomState ? np.random.Generator): the random state drawing the entropy.
+
+    Returns:
+        (np.random.SeedSequence): the seed sequence.
+    """
+    if isinstance(rng, np.random.Generator):
+        entropy = rng.integers(2**32, size=4)
+    else:
+        entropy = rng.randint(2**32, size=4, dtype=np.int64)
+    return np.random.SeedSequence([int(value) for value in entropy])
+
+
+def spawn_random_states(rng, n: int) -> list:
+    """Derive ``n`` independent random states from ``rng``, of the same kind as ``rng``.
+
+    The children are seeded from a ``np.random.SeedSequence`` whose entropy is drawn from ``rng`` so that they are reproducible when ``rng`` is seeded.
+
+    Args:
+        rng (np.random.RandomState ? np.random.Generator): the parent random state.
+        n (int): the number of random states to create.
+
+    Returns:
+        (list): a list of ``n`` random states.
+    """
+    children = seed_sequence(rng).spawn(n)
+
+    if isinstance(rng, np.random.Generator):
+        return [np.random.default_rng(child) for child in children]
+    return [np.random.RandomState(np.random.MT19937(child)) for child in children]
+
+
+def to_flat(columns: dict, size: int):
+    """Stack the columns of samples into a 2-dim array where each row is a sample.
+
+    Args:
+        columns (dict): a dict where keys are variable names and values are 1-dim arrays of samples.
+        size (int): the number of samples.
+
+    Returns:
+        (np.ndarray): an array of shape ``(size, len(columns))``.
+    """
+    if not columns:
+        return np.empty((size, 0))
+    return np.column_stack(list(columns.values()))
+
+
+def to_structured(columns: dict, size: int):
+    """Convert the columns of samples into a structured array with a field per variable.
+
+    Args:
+        columns (dict): a dict where keys are variable names and values are 1-dim arrays of samples.
+        size (int): the number of samples.
+
+    Returns:
+        (np.ndarray): a structured array of shape ``(size,)``.
+    """
+    samples = np.empty(size, dtype=[(var_id, column.dtype) for var_id, column in columns.items()])
+    for var_id, column in columns.items():
+        samples[var_id] = column
+    return samples
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+import numpy as np
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_memoize_call(self):
+
+        calls = []
+
+        @mpy.meta
+        def load(size):
+            calls.append(size)
+            return np.zeros(size)
+
+        @mpy.meta
+        def f(data, x):
+            return len(data) + x
+
+        data = mpy.memoize(load(mpy.Int(1, 10, name="size")))
+        program = f(data, mpy.Float(0, 1, name="x"))
+
+        assert program.evaluate({"size": 2, "x": 0.5}) == 2.5
+        assert program.evaluate({"size": 2, "x": 0.25}) == 2.25
+        assert calls == [2]
+
+        # clones share the cache of the original expression
+        assert program.clone().freeze({"size": 2, "x": 0.0}).evaluate() == 2.0
+        assert calls == [2]
+
+        assert program.evaluate({"size": 3, "x": 0.0}) == 3.0
+        assert calls == [2, 3]
+
+    def test_memoize_object(self):
+
+        calls = []
+
+        @mpy.meta
+        class Foo:
+            def __init__(self, a):
+                calls.append(a)
+                self.a = a
+
+        mpy.memoize(Foo, max_size=1)
+        program = Foo(mpy.Int(0, 10, name="a")).a
+
+        assert program.evaluate({"a": 1}) == 1
+        assert program.evaluate({"a": 1}) == 1
+        assert program.evaluate({"a": 2}) == 2
+        assert program.evaluate({"a": 1}) == 1
+        assert calls == [1, 2, 1]
+
+    def test_result_cache(self):
+
+        cache = mpy.ResultCache(max_size=None, max_bytes=100)
+        cache.put("a", np.zeros(5))  # 40 bytes
+        cache.put("b", np.zeros(5))
+        assert cache.get("a") is not None
+        cache.put("c", np.zeros(5))
+
+        # "b" is the least recently used
+        assert "b" not in cache
+        assert len(cache) == 2 and cache.nbytes == 80
+
+        # too large to be stored
+        cache.put("d", np.zeros(20))
+        assert "d" not in cache
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+
+
+@mpy.meta
+def f(x):
+    return x
+
+
+@mpy.meta
+def g(x):
+    return -x
+
+
+@mpy.meta
+def h(x):
+    return x + 1
+
+
+@mpy.meta
+class Foo:
+    def __init__(self, a):
+        self.a = a
+
+    def __call__(self, x):
+        return self.a - x
+
+
+class TestCompile(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_function(self):
+
+        program = h(mpy.List([0, 1, 2]))
+        compiled = program.compile()
+        assert isinstance(compiled, mpy.CompiledExpression)
+        assert [i.opcode for i in compiled.instructions] == ["load_var", "call_function"]
+        assert compiled.evaluate({"0": 0}) == 1
+        assert compiled.evaluate({"0": 2}) == 3
+
+        # the expression is left untouched
+        assert program.variables()["0"].value is None
+
+    def test_class(self):
+
+        foo = Foo(mpy.List([1, 2, 3]))
+        program = foo(mpy.List([4, 5, 6]))
+        compiled = program.compile()
+        assert compiled({"0": 2, "1": 0}) == -1
+        assert compiled({"0": 0, "1": 1}) == -4
+
+        assert foo.a.compile()({"0": 1}) == 2
+
+    def test_operators(self):
+
+        a = mpy.Float(0, 10, name="a")
+        b = mpy.Int(0, 10, name="b")
+        program = -(a * 2 + b) + 1
+        compiled = program.compile()
+        assert compiled({"a": 1.5, "b": 2}) == -4
+
+        program = f([a, {"b": b}])[1]["b"]
+        assert program.compile()({"a": 1.5, "b": 2}) == 2
+
+        with self.assertRaises(ValueError):
+            compiled({"a": 11, "b": 2})
+
+    def test_hierarchical(self):
+
+        program = h(mpy.List([f(mpy.List([1, 3, 5])), g(mpy.List([2, 4, 6]))]))
+        compiled = program.compile()
+
+        # only the variables of the selected branch are required
+        assert compiled({"2": 0, "0": 2}) == 6
+        assert compiled({"2": 1, "1": 1}) == -3
+
+        program = h(mpy.List([f, g])(1))
+        assert program.compile()({"3": 1}) == 0
+
+    def test_shared_node(self):
+
+        calls = []
+
+        @mpy.meta
+        def counter(x):
+            calls.append(x)
+            return x
+
+        x = counter(mpy.Int(0, 10, name="x"))
+        program = f([x, x])
+        assert program.compile()({"x": 3}) == [3, 3]
+        assert len(calls) == 1
+
+    def test_shared_node_branch(self):
+
+        calls = []
+
+        @mpy.meta
+        def counter(x):
+            calls.append(x)
+            return [x]
+
+        @mpy.meta
+        def same(a, b):
+            return a is b
+
+        # the node is shared by the plan and a branch of the List
+        x = counter(1)
+        program = same(x, mpy.List([x, 2], name="y"))
+        assert program.compile()({"y": 0})
+        assert program.evaluate({"y": 0})
+        assert len(calls) == 2
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert program.evaluate({"y": 0}, executor=executor)
+        assert asyncio.run(program.aevaluate({"y": 0}))
+        assert mpy.EvaluationSession(program).evaluate({"y": 0})
+        assert len(calls) == 5
+
+        # the branch is only evaluated if it is selected
+        calls.clear()
+        program = same(1, mpy.List([counter(2), 2], name="z"))
+        assert not program.evaluate({"z": 1})
+        assert calls == []
+
+    def test_cached_plan(self):
+
+        inner = g(mpy.Int(0, 10, name="x"))
+        program = f([inner, 1])
+
+        # the plan is compiled once
+        plan = program.compile()
+        assert program.compile() is plan
+        assert program.evaluate({"x": 2}) == [-2, 1]
+        assert program.compile() is plan
+
+        # modifying a nested node drops the plan
+        inner.args = [mpy.Int(0, 10, name="y")]
+        assert program.compile() is not plan
+        assert program.evaluate({"y": 3}) == [-3, 1]
+
+        # memoizing a nested node drops the plan
+        calls = []
+
+        @mpy.meta
+        def counter(x):
+            calls.append(x)
+            return x
+
+        node = counter(mpy.Int(0, 10, name="z"))
+        program = f([node])
+        program.evaluate({"z": 1})
+        mpy.memoize(node)
+        program.evaluate({"z": 1})
+        program.evaluate({"z": 1})
+        assert calls == [1, 1]
+
+        # clones do not share the plan
+        assert program.clone().compile() is not program.compile()
@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import numpy as np
+import metalgpy as mpy
+from metalgpy.constraints import Constraint, RejectionSampler, check
+from metalgpy.sampler import ConditionalSampler, RandomSampler
+
+
+@mpy.meta
+def f(x):
+    return x
+
+
+class TestConstraints(unittest.TestCase):
+    def test_constraint(self):
+
+        units_1 = mpy.Int(8, 64, name="units_1")
+        units_2 = mpy.Int(8, 64, name="units_2")
+        lr = mpy.Float(0.001, 0.1, name="lr")
+        activation = mpy.List(["relu", "tanh"], name="activation")
+
+        constraint = Constraint(units_1 >= units_2, name="units")
+        assert repr(constraint) == "Constraint(units)"
+        assert constraint.variables == ["units_1", "units_2"]
+
+        columns = {"units_1": np.array([8, 32, 64]), "units_2": np.array([16, 32, 8])}
+        assert np.array_equal(constraint(columns), [False, True, True])
+        assert constraint.is_satisfied({"units_1": 32, "units_2": 8})
+
+        columns = {
+            "units_1": np.array([8, 32, 64]),
+            "lr": np.array([0.001, 0.01, 0.1]),
+            "activation": np.array([0, 1, 1]),
+        }
+        mask = check([units_1 * lr < 1, activation != "relu"], columns)
+        assert np.array_equal(mask, [False, True, False])
+
+        # variables calling functions cannot be checked in batch
+        with self.assertRaises(ValueError):
+            Constraint(f(units_1) > 1)
+
+        with self.assertRaises(ValueError):
+            Constraint(activation == "relu")
+
+    def test_inactive_variables(self):
+
+        a = mpy.Int(0, 10, name="a")
+        b = mpy.Int(0, 10, name="b")
+        program = mpy.List([a, b], name="c")
+
+        constraint = Constraint(a < 5)
+        samples = ConditionalSampler(program, rng=0).sample_columns(100)
+        mask = constraint(samples)
+        assert np.array_equal(mask, np.isnan(samples["a"]) | (samples["a"] < 5))
+
+    def test_rejection_sampler(self):
+
+        units_1 = mpy.Int(8, 64, name="units_1")
+        units_2 = mpy.Int(8, 64, name="units_2")
+        lr = mpy.Float(0, 1, name="lr")
+        program = f([units_1, units_2, lr])
+
+        constraints = [Constraint(units_1 >= units_2, name="units"), lr < 0.5]
+        sampler = RejectionSampler(RandomSampler(program, rng=42), constraints)
+
+        columns = sampler.sample_columns(1000)
+        assert np.all(columns["units_1"] >= columns["units_2"])
+        assert np.all(columns["lr"] < 0.5)
+        assert len(columns["lr"]) == 1000
+
+        metrics = sampler.metrics()
+        assert metrics["drawn"] >= 1000 and metrics["repaired"] == 0
+        assert metrics["accepted"] == 1000 and metrics["feasible"] >= 1000
+        assert 0.2 < sampler.acceptance_rate < 0.3
+        assert set(metrics["violations"]) == {"units", repr(constraints[1])}
+
+        columns = sampler.sample_columns(0)
+        assert len(columns["lr"]) == 0 and columns["units_1"].dtype == np.int64
+
+        for sample in sampler.sample(10, flat=False):
+            assert sample["units_1"] >= sample["units_2"]
+        assert sampler.sample().shape == (3,)
+
+        # infeasible candidates are repaired
+        def repair(columns):
+            units = np.sort(np.column_stack([columns["units_1"], columns["units_2"]]), axis=1)
+            return {"units_1": units[:, 1], "units_2": units[:, 0], "lr": columns["lr"]}
+
+        sampler = RejectionSampler(RandomSampler(program, rng=42), constraints[:1], repair=repair)
+        columns = sampler.sample_columns(100)
+        assert np.all(columns["units_1"] >= columns["units_2"])
+        assert sampler.acceptance_rate == 1 and sampler.n_repaired > 0
+
+        # infeasible constraints
+        sampler = RejectionSampler(RandomSampler(program, rng=42), [lr > 1], max_draws=1000)
+        with self.assertRaises(RuntimeError):
+            sampler.sample(10)
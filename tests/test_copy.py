@@ -1,4 +1,5 @@
 import os
+import pickle
 import sys
 import unittest
 
@@ -78,3 +79,51 @@ class TestCopy(unittest.TestCase):
         assert y_clone_choices["0"] == mpy.List([1,2,3])
         assert y_clone_choices["2"] == mpy.List([4,5,6])
 
+    def test_slots(self):
+
+        foo = Foo(mpy.List([1, 2, 3]))
+        y = foo(mpy.List([4, 5, 6]))[0]
+
+        # nodes only store their fields
+        assert type(y).__dictoffset__ == 0
+        assert type(foo).__dictoffset__ == 0
+
+        # unknown attributes are attribute accesses of the expression
+        assert isinstance(y.expression, mpy.ExpressionCallExpression)
+        assert isinstance(y.real, mpy.ExpressionAttributeAccess)
+
+        y_copy = y.clone(deep=True)
+        assert y_copy.fingerprint() == y.fingerprint()
+        assert list(y_copy.variables()) == list(y.variables())
+
+        x = mpy.Int(0, 10, name="x")
+        z = -(x + 1) * 2
+        z_copy = pickle.loads(pickle.dumps(z))
+        assert z_copy.fingerprint() == z.fingerprint()
+        assert z_copy.evaluate({"x": 2}) == -6
+
+    def test_copy_on_write_clone(self):
+
+        x = mpy.Int(0, 10, name="x")
+        payload = Foo(np.arange(10))
+        program = payload(mpy.List([1, x], name="y"))[1] + 1
+
+        clone = program.clone(copy_on_write=True)
+        assert clone.fingerprint() == program.fingerprint()
+
+        # sub-expressions without variables are shared
+        assert clone.left.expression.expression is payload
+        assert clone.left is not program.left
+        assert clone.variables()["x"] is not x
+
+        clone.freeze({"y": 1, "x": 4})
+        assert clone.evaluate() == -2
+        assert program.variables()["y"].value is None
+        assert x.value is None
+
+        # evaluation leaves the shared sub-expressions untouched
+        assert isinstance(payload.args[0], np.ndarray)
+        assert program.clone(copy_on_write=True).freeze({"y": 0}).evaluate() == 1
+
+        with self.assertRaises(ValueError):
+            program.clone(deep=True, copy_on_write=True)
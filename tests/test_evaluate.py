@@ -0,0 +1,250 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+import numpy as np
+
+
+@mpy.meta
+def f(x, y):
+    return x * y
+
+
+@mpy.meta
+def g(x):
+    return -x
+
+
+class TestEvaluate(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_evaluate_choice(self):
+
+        program = f(mpy.Int(0, 10, name="x"), mpy.List([1, g(mpy.Float(0, 1, name="z"))], name="y"))
+
+        assert program.evaluate({"x": 2, "y": 0}) == 2
+        assert program.evaluate({"x": 2, "y": 1, "z": 0.5}) == -1.0
+
+        # the expression is left untouched and can still be frozen
+        variables = program.variables()
+        assert all(v.value is None for v in variables.values())
+        program.freeze({"x": 3, "y": 0})
+        assert program.evaluate() == 3
+
+    def test_evaluate_threads(self):
+
+        program = f(mpy.Int(0, 100, name="x"), 2)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda x: program.evaluate({"x": x}), range(100)))
+
+        assert results == [2 * x for x in range(100)]
+
+    def test_evaluate_batch(self):
+
+        a = mpy.Float(0, 1, name="a")
+        b = mpy.Int(0, 5, name="b")
+        c = mpy.List([1, 10, 100], name="c")
+        program = -(a + b * c)
+
+        choices = np.array([[0.5, 1, 0], [0.25, 2, 2], [0.0, 5, 1]])
+        results = program.evaluate_batch(choices)
+        expected = [program.evaluate(dict(zip("abc", x))) for x in choices]
+        assert np.allclose(results, expected)
+
+        # columns can also be passed by variable id
+        results = program.compile().evaluate_batch({"a": choices[:, 0], "b": choices[:, 1], "c": choices[:, 2]})
+        assert np.allclose(results, expected)
+
+        with self.assertRaises(ValueError):
+            program.evaluate_batch({"a": [2.0], "b": [0], "c": [0]})
+
+        with self.assertRaises(ValueError):
+            f(a, b).evaluate_batch(choices[:, :2])
+
+    def test_partial_evaluate(self):
+
+        calls = []
+
+        @mpy.meta
+        def build(n):
+            calls.append(n)
+            return list(range(n))
+
+        x = mpy.Int(0, 10, name="x")
+        program = f(build(3)[2] + 1, x)
+
+        folded = program.partial_evaluate()
+        assert len(calls) == 1
+        assert list(folded.variables()) == ["x"]
+        assert folded.evaluate({"x": 2}) == 6
+        assert folded.evaluate({"x": 3}) == 9
+        assert len(calls) == 1
+
+        # the expression is left untouched
+        assert program.evaluate({"x": 2}) == 6
+        assert len(calls) == 2
+
+        # specialization on a partial choice
+        y = mpy.List([1, g(mpy.Float(0, 1, name="z"))], name="y")
+        program = f(x, y)
+        folded = program.partial_evaluate({"y": 1})
+        assert list(folded.variables()) == ["x", "z"]
+        assert folded.evaluate({"x": 2, "z": 0.5}) == -1.0
+        assert program.partial_evaluate({"x": 2, "y": 0}) == 2
+
+    def test_partial_evaluate_memoize(self):
+
+        @mpy.meta
+        def sq(x):
+            return x * x
+
+        x = mpy.Int(0, 10, name="x")
+        y = mpy.Int(0, 10, name="y")
+
+        node = mpy.memoize(sq(x))
+        node.freeze({"x": 1})
+        assert node.evaluate() == 1
+        # the folded result is not the memoized result of the frozen value
+        assert node.partial_evaluate({"x": 2}) == 4
+        assert node.partial_evaluate({"x": 1}) == 1
+
+        # memoized results of specialized trees are keyed by the folded values
+        node = mpy.memoize(f(x, y))
+        assert node.evaluate({"x": 2, "y": 3}) == 6
+        program_2 = node.partial_evaluate({"x": 2})
+        program_3 = node.partial_evaluate({"x": 3})
+        assert program_2.evaluate({"y": 4}) == 8
+        assert program_3.evaluate({"y": 4}) == 12
+        assert program_3.clone().freeze({"y": 5}).evaluate() == 15
+
+    def test_evaluate_executor(self):
+
+        barrier = threading.Barrier(3, timeout=10)
+        threads = set()
+
+        @mpy.meta
+        def load(x):
+            threads.update(t.name for t in threading.enumerate())
+            # the three loads can only complete if they run concurrently
+            barrier.wait()
+            return x
+
+        @mpy.meta
+        def concat(*args):
+            return list(args)
+
+        x = mpy.Int(0, 10, name="x")
+        program = concat(load(x), load(x + 1), load(2) * 10)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            assert program.evaluate({"x": 1}, executor=executor) == [1, 2, 20]
+            assert program.compile().evaluate({"x": 2}, executor=executor) == [2, 3, 20]
+
+        # List branches and memoized calls do not block the other calls
+        barrier = threading.Barrier(3, timeout=10)
+        start = time.perf_counter()
+        threads.clear()
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="plan") as executor:
+            program = concat(mpy.List([load(x), 2], name="y"), load(1), load(2))
+            assert program.evaluate({"x": 1, "y": 0}, executor=executor) == [1, 1, 2]
+            program = concat(mpy.memoize(load(x)), load(1), load(2))
+            assert program.evaluate({"x": 3}, executor=executor) == [3, 1, 2]
+        assert time.perf_counter() - start < 5
+
+        # they are scheduled with the other calls, without helper threads
+        main = threading.main_thread().name
+        assert all(name == main or name.startswith("plan") for name in threads)
+
+        # variables of a frozen tree are resolved from their values
+        program = concat(load(x), mpy.List([load(x + 1), 5], name="y"), load(2))
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            frozen = program.clone().freeze({"x": 1, "y": 0})
+            assert frozen.evaluate(executor=executor) == [1, 2, 2]
+            with self.assertRaises(ValueError):
+                program.evaluate(executor=executor)
+
+        @mpy.meta
+        def fail(x):
+            raise RuntimeError(x)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(RuntimeError):
+                f(fail(x), 2).evaluate({"x": 1}, executor=executor)
+
+    def test_aevaluate(self):
+
+        running = []
+
+        @mpy.meta
+        async def score(x):
+            running.append(x)
+            await asyncio.sleep(0.01)
+            # all the scores are in flight
+            assert len(running) == 3
+            return x
+
+        @mpy.meta
+        def total(*args):
+            return sum(args)
+
+        x = mpy.Int(0, 10, name="x")
+        y = mpy.List([score(1), 2], name="y")
+        program = total(score(x), score(x * 2), y)
+
+        assert asyncio.run(program.aevaluate({"x": 1, "y": 0})) == 4
+        running.clear()
+        program = f(score(x), score(x + 1)) + score(1)
+        assert asyncio.run(program.aevaluate({"x": 2})) == 7
+
+    def test_session(self):
+
+        calls = []
+
+        @mpy.meta
+        def count(name, x):
+            calls.append(name)
+            return x
+
+        x = mpy.Int(0, 10, name="x")
+        y = mpy.Int(0, 10, name="y")
+        z = mpy.List([1, count("z", y)], name="z")
+        program = f(count("x", x), count("y", y)) + z
+
+        session = mpy.EvaluationSession(program)
+        assert session.evaluate({"x": 1, "y": 2, "z": 0}) == 3
+        assert calls == ["x", "y"]
+
+        # only the nodes depending on x are evaluated
+        assert session.evaluate({"x": 3, "y": 2, "z": 0}) == 7
+        assert calls == ["x", "y", "x"]
+        assert session.updates == 4
+
+        # nothing changed
+        assert session.evaluate({"x": 3, "y": 2, "z": 0}) == 7
+        assert session.updates == 0
+
+        assert session.evaluate({"x": 3, "y": 2, "z": 1}) == 8
+        assert calls == ["x", "y", "x", "z"]
+
+        assert session.evaluate({"x": 3, "y": 1, "z": 1}) == 4
+        assert calls == ["x", "y", "x", "z", "y", "z"]
+
+        with self.assertRaises(ValueError):
+            session.evaluate({"x": 11, "y": 1, "z": 1})
+
+        # a failed evaluation evaluates all the nodes next time
+        assert session.evaluate({"x": 1, "y": 1, "z": 0}) == 2
+        assert calls[-2:] == ["x", "y"]
@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+import numpy as np
+
+
+@mpy.meta
+def f(*args, **kwargs):
+    return args, kwargs
+
+
+@mpy.meta
+class Dense:
+    def __init__(self, units):
+        self.units = units
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_fingerprint(self):
+
+        x = mpy.Int(0, 10, name="x")
+        a = f(Dense(x) + 1, y=np.arange(3), z="z")
+        b = f(Dense(mpy.Int(0, 10, name="x")) + 1, z="z", y=np.arange(3))
+        assert a.fingerprint() == b.fingerprint()
+
+        # frozen values are not part of the structure
+        a.freeze({"x": 3})
+        assert a.fingerprint() == b.fingerprint()
+
+        assert f(Dense(x) + 2, y=np.arange(3), z="z").fingerprint() != b.fingerprint()
+        assert f(Dense(x) + 1, y=np.arange(4), z="z").fingerprint() != b.fingerprint()
+        assert f(Dense(mpy.Int(0, 10))).fingerprint() != f(Dense(mpy.Int(0, 10))).fingerprint()
+
+        # fingerprints can be used as keys
+        programs = {a.fingerprint(): a}
+        assert b.fingerprint() in programs
+
+    def test_intern(self):
+
+        table = mpy.InternTable()
+
+        x = mpy.Int(0, 10, name="x")
+        layers = [Dense(x) for _ in range(3)]
+        program = table.intern(f(*layers))
+        assert all(layer is program.args[0] for layer in program.args)
+        assert len(table) == 3
+
+        other = table.intern(f(Dense(mpy.Int(0, 10, name="x"))))
+        assert other.args[0] is program.args[0]
+        assert other in table
+        assert table[program.fingerprint()] is program
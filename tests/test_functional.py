@@ -1,3 +1,4 @@
+import gc
 import inspect
 import os
 import sys
@@ -84,3 +85,53 @@ class TestFunctional(unittest.TestCase):
         program = mpy.meta(sum)([1 for i in range(10)])
         res = program.evaluate()
         assert res == 10
+
+    def test_meta_identity(self):
+
+        arange = mpy.meta(np.arange)
+        assert mpy.meta(np.arange) is arange
+        assert type(mpy.meta(np.zeros)) is type(mpy.meta(np.zeros))
+
+        # different objects with the same name share their class
+        def h(x):
+            return x
+        h_meta = mpy.meta(h)
+        def h(x):
+            return -x
+        assert mpy.meta(h) is not h_meta
+        assert type(mpy.meta(h)) is type(h_meta)
+        assert mpy.meta(h)(1).evaluate() == -1
+
+        # the memoized object is returned again once it is not referenced anymore
+        mpy.memoize(mpy.meta(np.cumsum))
+        gc.collect()
+        assert mpy.meta(np.cumsum)._call_cache is not None
+
+    def test_meta_attributes(self):
+
+        class Model:
+            def memoize(self):
+                return "memoize"
+
+            def invalidate(self):
+                return "invalidate"
+
+            def compile(self, optimizer):
+                return optimizer
+
+        # the attributes of wrapped objects are not hidden by helpers
+        model = mpy.meta(Model)()
+        assert model.memoize().evaluate() == "memoize"
+        assert model.invalidate().evaluate() == "invalidate"
+        assert mpy.ExpressionAttributeAccess(model, "compile")("adam").evaluate() == "adam"
+
+    def test_meta_module(self):
+
+        np_meta = mpy.meta_module(np)
+        assert np_meta.arange is mpy.meta(np.arange)
+        assert np_meta.pi == np.pi
+        assert isinstance(np_meta.random, mpy.MetaModule)
+        assert "arange" in dir(np_meta)
+
+        program = np_meta.arange(mpy.Int(1, 10, name="n"))
+        assert program.evaluate({"n": 3}).tolist() == [0, 1, 2]
@@ -48,3 +48,38 @@ class TestHierarchical(unittest.TestCase):
         res = program.evaluate()
         assert res == 6
 
+    def test_child_choices(self):
+        x = mpy.List([1, 3, 5])
+        y = mpy.Int(0, 10)
+        program = mpy.List([f(x), 2, [g(y), x]])
+        assert program.child_choices() == {0: {"0": x}, 2: {"1": y, "0": x}}
+
+    def test_conditional_sampler(self):
+        from metalgpy.sampler import ConditionalSampler
+
+        a = mpy.List([1, 3, 5], name="a")
+        b = mpy.Int(2, 6, name="b")
+        c = mpy.Float(0, 1, name="c")
+        program = h(mpy.List([f(a), g(mpy.List([b, c], name="d"))], name="e"))
+
+        sampler = ConditionalSampler(program, rng=np.random.RandomState(42))
+        columns = sampler.sample_columns(1000)
+        assert list(columns) == list(program.variables())
+
+        e, d = columns["e"], columns["d"]
+        assert not np.isnan(e).any()
+        # variables are drawn only in the selected branches
+        assert np.array_equal(np.isnan(columns["a"]), e != 0)
+        assert np.array_equal(np.isnan(d), e != 1)
+        assert np.array_equal(np.isnan(columns["b"]), ~((e == 1) & (d == 0)))
+        assert np.array_equal(np.isnan(columns["c"]), ~((e == 1) & (d == 1)))
+        assert 0 < np.count_nonzero(~np.isnan(columns["c"])) < 500
+
+        flat = sampler.sample(5)
+        assert flat.shape == (5, 5)
+
+        for sample in sampler.sample(20, flat=False):
+            assert isinstance(sample["e"], int)
+            expected = {"e", "a"} if sample["e"] == 0 else {"e", "d", "bc"[sample["d"]]}
+            assert set(sample) == expected
+            program.clone().freeze(sample).evaluate()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+
+
+def run(code):
+    """Run ``code`` in a fresh interpreter and return its output."""
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=PKG, capture_output=True, text=True, check=True
+    ).stdout
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy_import(self):
+
+        # "python -X importtime -c 'import metalgpy'" details the import time
+        out = run(
+            "import sys\n"
+            "import metalgpy\n"
+            "print(' '.join(m for m in ('scipy.stats', 'sklearn', 'pandas', 'metalgpy.optimizer.skopt') if m in sys.modules))\n"
+        )
+        assert out.strip() == ""
+
+    def test_lazy_attributes(self):
+
+        assert callable(mpy.sample)
+        assert mpy.optimizer.BayesianOptimizer is not None
+        assert mpy.sampler.RandomSampler is not None
+        assert mpy.constraints.Constraint is not None
+        assert "sample" in dir(mpy)
+
+        with self.assertRaises(AttributeError):
+            mpy.unknown
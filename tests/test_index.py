@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+
+
+@mpy.meta
+def f(*args):
+    return args
+
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_index(self):
+
+        x = mpy.Int(0, 10, name="x")
+        inner = f(x, mpy.List([mpy.Float(0, 1, name="z"), 1], name="y"))
+        program = f(inner, x)
+
+        index = program._variable_index()
+        assert list(index.variables) == ["x", "y", "z"]
+        assert list(index.choices) == ["x", "y"]
+        assert index.position == {"x": 0, "y": 1, "z": 2}
+        assert len(index.parents["x"]) == 2
+
+        # the index is cached
+        assert program._variable_index() is index
+        assert program.variables() == index.variables
+
+    def test_invalidation(self):
+
+        inner = f(mpy.Int(0, 10, name="x"))
+        program = f(f(inner))
+        assert list(program.variables()) == ["x"]
+
+        # setting an attribute of a nested node invalidates the index of the root
+        inner.args = [mpy.Int(0, 10, name="y")]
+        assert list(program.variables()) == ["y"]
+
+        # in-place modifications require an explicit invalidation
+        inner.args.append(mpy.Int(0, 10, name="z"))
+        mpy.invalidate(inner)
+        assert list(program.variables()) == ["y", "z"]
+
+        # clones do not share the index
+        clone = program.clone()
+        clone.args[0].args[0].args = []
+        assert list(program.variables()) == ["y", "z"]
+        assert clone.variables() == {}
+
+    def test_index_attribute(self):
+
+        @mpy.meta
+        def names(k):
+            return ["a", "b", "c"][:k]
+
+        # "index" is an attribute of the result, not a method of expressions
+        program = names(mpy.Int(1, 3, name="k")).index("b")
+        program.freeze({"k": 3})
+        assert program.evaluate() == 1
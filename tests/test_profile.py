@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+import numpy as np
+
+
+@mpy.meta
+def slow(x):
+    time.sleep(0.01)
+    return np.zeros(x)
+
+
+@mpy.meta
+def total(*args):
+    return sum(len(a) for a in args)
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_profiler(self):
+
+        x = mpy.Int(1, 10, name="x")
+        program = total(slow(x), slow(4))
+
+        with mpy.Profiler() as profiler:
+            assert program.evaluate({"x": 2}) == 6
+            assert program.clone().freeze({"x": 3}).evaluate() == 7
+
+        # profiling stops with the context
+        program.evaluate({"x": 2})
+
+        stats = profiler.stats()
+        assert [row["name"] for row in stats][:2] == ["slow", "slow"]
+        assert [row["calls"] for row in stats] == [2, 2, 2]
+        assert stats[0]["time"] >= 0.02
+        assert {row["nbytes"] for row in stats[:2]} == {32, 20}
+        assert stats[2]["name"] == "total"
+        assert stats[2]["fingerprint"] == program.fingerprint()
+
+        lines = profiler.collapsed().splitlines()
+        assert len(lines) == 2
+        assert lines[0].startswith("total ")
+        assert lines[1].startswith("total;slow ")
+        assert int(lines[1].split()[-1]) >= 40000
+
+        out = io.StringIO()
+        profiler.print_stats(file=out)
+        assert len(out.getvalue().splitlines()) == 4
+
+    def test_hierarchical(self):
+
+        program = total(mpy.List([slow(1), slow(2)], name="y"))
+
+        with mpy.Profiler() as profiler:
+            program.evaluate({"y": 1})
+
+        assert profiler.collapsed().splitlines()[1].startswith("total;slow ")
+
+    def test_memoize(self):
+
+        x = mpy.Int(1, 10, name="x")
+        program = total(mpy.memoize(slow(x)), slow(2))
+
+        with mpy.Profiler() as profiler:
+            program.evaluate({"x": 2})
+            program.evaluate({"x": 2})
+            program.clone().freeze({"x": 3}).evaluate()
+
+        # memoized calls are recorded once per cache miss
+        calls = {(row["name"], row["fingerprint"]): row["calls"] for row in profiler.stats()}
+        assert calls[("slow", program.args[0].fingerprint())] == 2
+        assert calls[("slow", program.args[1].fingerprint())] == 3
@@ -7,11 +7,12 @@ PKG = os.path.join(HERE, "..")
 
 sys.path.insert(0, PKG)
 
+import pickle
 import scipy
 import collections
 import numpy as np
 import metalgpy as mpy
-from metalgpy.sampler import RandomSampler
+from metalgpy.sampler import HaltonSampler, LhsSampler, QMCSampler, RandomSampler, SobolSampler
 
 
 @mpy.meta
@@ -191,3 +192,138 @@ class TestSampler(unittest.TestCase):
 
         assert eval_model.layers[0].activation == act_fn
         assert eval_model.layers[0].units == num_units
+
+    def test_sample_columns(self):
+
+        program = f(
+            mpy.Int(1, 5, name="x"),
+            mpy.List([mpy.Float(0, 1, name="z"), 2], name="y"),
+        )
+        s = RandomSampler(program, rng=np.random.default_rng(42))
+        columns = s.sample_columns(100)
+
+        assert list(columns) == list(program.variables())
+        assert columns["x"].dtype.kind == "i" and columns["y"].dtype.kind == "i"
+        assert columns["z"].dtype.kind == "f"
+        assert columns["x"].shape == (100,)
+        assert np.all((1 <= columns["x"]) & (columns["x"] <= 5))
+
+        samples = s.sample_columns(10, structured=True)
+        assert samples.dtype.names == ("x", "y", "z")
+        assert samples["x"].dtype.kind == "i"
+
+        # same stream as the flat samples
+        flat = RandomSampler(program, rng=np.random.default_rng(0)).sample(10)
+        columns = RandomSampler(program, rng=np.random.default_rng(0)).sample_columns(10)
+        assert np.array_equal(flat, np.column_stack(list(columns.values())))
+
+    def test_iter_samples(self):
+
+        program = f(
+            mpy.Int(1, 5, name="x"),
+            mpy.List([mpy.Float(0, 1, name="z"), 2], name="y"),
+        )
+
+        for rng in [np.random.RandomState, np.random.default_rng]:
+            s = RandomSampler(program, rng=rng(42))
+            chunks = list(s.iter_samples(chunk_size=30, size=100))
+            assert [len(chunk["x"]) for chunk in chunks] == [30, 30, 30, 10]
+
+            # the stream does not depend on the size of the chunks
+            (single,) = RandomSampler(program, rng=rng(42)).iter_samples(chunk_size=100, size=100)
+            for var_id, column in single.items():
+                assert np.array_equal(column, np.concatenate([chunk[var_id] for chunk in chunks]))
+
+        # indefinite iteration
+        chunks = RandomSampler(program, rng=0).iter_samples(chunk_size=8, structured=True)
+        for _ in range(3):
+            samples = next(chunks)
+            assert samples.shape == (8,) and samples.dtype.names == ("x", "y", "z")
+
+        with self.assertRaises(ValueError):
+            next(s.iter_samples(chunk_size=0))
+
+    def test_compiled_draws(self):
+
+        program = f(mpy.Int(1, 3, name="x"), mpy.Float(2, 4, name="y"))
+        dist_map = {"y": (scipy.stats.norm, {"loc": 3, "scale": 0.1})}
+
+        for rng in [np.random.RandomState(0), np.random.default_rng(0)]:
+            s = RandomSampler(program, rng=rng)
+            dist_map_ = s._dist_map
+            columns = s.sample_columns(1000)
+
+            # the distributions are mapped once
+            assert s._dist_map is dist_map_
+            assert set(np.unique(columns["x"])) == {1, 2, 3}
+            assert np.all((2 <= columns["y"]) & (columns["y"] < 4))
+
+            # custom distributions are drawn with scipy
+            columns = RandomSampler(program, dist_map, rng=rng).sample_columns(1000)
+            assert abs(columns["y"].mean() - 3) < 0.01
+            assert abs(columns["y"].std() - 0.1) < 0.01
+
+    def test_qmc_samplers(self):
+
+        program = f(
+            mpy.Int(1, 4, name="x"),
+            mpy.List([mpy.Float(0, 1, name="z"), 2], name="y"),
+        )
+
+        for sampler_cls in [SobolSampler, HaltonSampler, LhsSampler]:
+            s = sampler_cls(program, rng=42)
+            columns = s.sample_columns(64)
+
+            assert list(columns) == list(program.variables())
+            assert columns["x"].dtype.kind == "i" and columns["y"].dtype.kind == "i"
+            assert set(np.unique(columns["x"])) == {1, 2, 3, 4}
+            assert set(np.unique(columns["y"])) == {0, 1}
+            assert np.all((0 <= columns["z"]) & (columns["z"] < 1))
+
+            if sampler_cls is not HaltonSampler:
+                # stratified: each interval is drawn equally often
+                assert np.array_equal(np.bincount(columns["x"])[1:], [16, 16, 16, 16])
+                assert np.array_equal(np.bincount(columns["y"]), [32, 32])
+                assert np.array_equal(np.sort(np.floor(columns["z"] * 64)), np.arange(64))
+
+            # reproducible
+            flat = sampler_cls(program, rng=42).sample(64)
+            assert np.array_equal(flat, np.column_stack(list(columns.values())))
+
+            sample = s.sample(flat=False)
+            assert sample.keys() == program.variables().keys()
+            program.clone().freeze(sample).evaluate()
+
+        # preferred distributions are mapped with their inverse CDF
+        dist_map = {"z": (scipy.stats.norm, {"loc": 3, "scale": 0.1})}
+        columns = SobolSampler(program, dist_map, rng=0).sample_columns(1024)
+        assert abs(columns["z"].mean() - 3) < 0.001
+
+        for i, evaluation in mpy.sample(SobolSampler(program, rng=0), size=2, rng=0):
+            evaluation.report(0)
+
+        # the engine is defined by the subclasses
+        with self.assertRaises(TypeError):
+            QMCSampler(program)
+
+    def test_spawn(self):
+
+        program = mpy.Int(1, 100, name="x") + mpy.Float(0, 1, name="y")
+
+        for sampler_cls in [RandomSampler, SobolSampler]:
+            s = sampler_cls(program, rng=np.random.SeedSequence(42))
+            assert isinstance(s.rng, np.random.Generator)
+
+            children = s.spawn(4)
+            pools = [child.sample(16) for child in children]
+            assert not np.array_equal(pools[0], pools[1])
+
+            # the children do not depend on the number of samplers
+            children = sampler_cls(program, rng=np.random.SeedSequence(42)).spawn(2)
+            for child, pool in zip(children, pools):
+                assert np.array_equal(child.sample(16), pool)
+
+            # the children can be sent to other processes
+            children = sampler_cls(program, rng=np.random.SeedSequence(42)).spawn(2)
+            for child, pool in zip(children, pools):
+                assert np.array_equal(pickle.loads(pickle.dumps(child)).sample(16), pool)
@@ -0,0 +1,69 @@
+import os
+import pickle
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+import numpy as np
+
+
+@mpy.meta
+def f(x, y):
+    return x * y
+
+
+@mpy.meta
+class Foo:
+    def __init__(self, a):
+        self.a = a
+
+    def __call__(self, x):
+        return self.a - x
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_round_trip(self):
+
+        x = mpy.Int(0, 10, name="x")
+        shared = f(x, np.arange(3))
+        program = Foo(mpy.List([1, shared], name="y"))(mpy.meta(sum)(shared)) + x
+
+        data = program.to_bytes()
+        assert data.startswith(b"MPY\x01")
+
+        decoded = mpy.Expression.from_bytes(data)
+        assert decoded.fingerprint() == program.fingerprint()
+        assert list(decoded.variables()) == list(program.variables())
+        assert decoded.evaluate({"x": 2, "y": 0}) == 1 - 6 + 2
+
+        # shared sub-expressions are decoded once
+        call = decoded.left
+        assert call.args[0].args[0] is call.expression.args[0]._values[1]
+
+        # functions are encoded by their import path
+        assert b"test_serialization" in data
+        assert len(data) < len(pickle.dumps(np.arange(3))) * 8
+
+    def test_frozen(self):
+
+        program = mpy.memoize(f(mpy.Float(0, 1, name="a"), 2))
+        program.freeze({"a": 0.5})
+        decoded = mpy.Expression.from_bytes(program.to_bytes())
+        assert decoded.evaluate() == 1.0
+
+    def test_errors(self):
+
+        with self.assertRaises(ValueError):
+            mpy.Expression.from_bytes(b"not an expression")
+
+        with self.assertRaises(ValueError):
+            mpy.Expression.from_bytes(b"MPY\xff")
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PKG = os.path.join(HERE, "..")
+
+sys.path.insert(0, PKG)
+
+import metalgpy as mpy
+
+
+@mpy.meta
+class Dense:
+    def __init__(self, units):
+        self.units = units
+
+    def __call__(self, x):
+        return x + self.units
+
+
+class TestTraversal(unittest.TestCase):
+    def setUp(self):
+        # initialization for test
+        mpy.VarExpression.var_id = 0
+
+    def test_deep_chain(self):
+
+        depth = 2 * sys.getrecursionlimit()
+
+        x = 0
+        for i in range(depth):
+            x = Dense(mpy.Int(1, 10, name=f"units_{i}"))(x)
+
+        variables = x.variables()
+        assert list(variables) == [f"units_{i}" for i in range(depth)]
+
+        choice = {k: 1 for k in variables}
+        assert x.evaluate(choice) == depth
+        assert len(x.fingerprint()) == 32
+
+        clone = x.clone()
+        clone.freeze(choice)
+        assert clone.evaluate() == depth
+
+    def test_shared_sub_expression(self):
+
+        units = mpy.Int(1, 10, name="units")
+        layer = Dense(units)
+        program = layer(layer(0))
+
+        clone = program.clone()
+        assert clone.args[0].expression is clone.expression
+
+        clone.freeze({"units": 2})
+        assert clone.evaluate() == 4
@@ -1,7 +1,9 @@
+import asyncio
 import os
 from re import A
 import sys
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 PKG = os.path.join(HERE, "..")
@@ -44,3 +46,73 @@ class TestVar(unittest.TestCase):
         v._low = 0
         v._high = 10
         assert hasattr(v, "_dist")
+
+    def test_scope(self):
+
+        def build(i):
+            with mpy.Scope(f"space_{i}"):
+                x = mpy.Int(0, 10)
+                with mpy.Scope("layer"):
+                    y = mpy.List([mpy.Float(0, 1), 1])
+                z = mpy.Float(0, 1, name="z")
+            return x + y + z
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            programs = list(executor.map(build, range(32)))
+
+        for i, program in enumerate(programs):
+            assert list(program.variables()) == [
+                f"space_{i}.0",
+                f"space_{i}.layer.1",
+                f"space_{i}.layer.0",
+                "z",
+            ]
+
+        # unnamed scopes number their variables independently of the global ids
+        c = mpy.Int(0, 1)
+        with mpy.Scope(start=5) as scope:
+            d = mpy.Int(0, 1)
+            assert d.id == "~.5"
+            assert scope.allocate() == 6
+        assert len((c + d).variables()) == 2
+
+        # unnamed scopes nested in a scope are numbered by their parent
+        with mpy.Scope("m"):
+            a = mpy.Int(0, 1)
+            with mpy.Scope():
+                b = mpy.Int(0, 1)
+            with self.assertRaises(ValueError):
+                mpy.Scope(start=1)
+        assert (a.id, b.id) == ("m.0", "m.1")
+
+        with mpy.Scope():
+            a = mpy.Int(0, 1)
+            with mpy.Scope():
+                b = mpy.Int(0, 1)
+        assert (a.id, b.id) == ("~.0", "~.1")
+
+    def test_scope_asyncio(self):
+
+        scope = mpy.Scope("space")
+
+        async def build(d1, d2):
+            with scope:
+                await asyncio.sleep(d1)
+                x = mpy.Int(0, 1)
+                await asyncio.sleep(d2)
+            return x
+
+        async def main():
+            # the tasks exit the scope in a different order than they entered it
+            return await asyncio.gather(build(0, 0.02), build(0.01, 0.04))
+
+        x, y = asyncio.run(main())
+        assert {x.id, y.id} == {"space.0", "space.1"}
+        assert mpy.Int(0, 1).id.isdigit()
+
+    def test_global_ids(self):
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            variables = list(executor.map(lambda _: mpy.Int(0, 1), range(1000)))
+
+        assert len({v.id for v in variables}) == 1000